@@ -0,0 +1,90 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Deadline:
+    """İstek için zaman bütçesi - aşamalar arasında kontrol edilir"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.partial = False  # Bütçe bittiği için atlanan aşama oldu mu
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def check(self, stage):
+        """Süre dolduysa aşamayı atla ve sonucu kısmi olarak işaretle"""
+        if self.expired():
+            if not self.partial:
+                print(f"⏰ Zaman bütçesi ({self.seconds:.1f}s) doldu, '{stage}' aşamasında kısmi sonuç dönülüyor")
+            self.partial = True
+            return False
+        return True
+
+
+def parse_timeout_header(value, default, maximum):
+    """X-Request-Timeout-Ms başlığını saniyeye çevir (geçersizse varsayılan)"""
+    try:
+        seconds = int(value) / 1000.0
+    except (TypeError, ValueError):
+        return default
+    return min(maximum, seconds) if seconds > 0 else default
+
+
+class AdmissionController:
+    """Eşzamanlı istek sınırı: tam → kısıtlı (ucuz) yol → reddet"""
+
+    FULL = "full"
+    DEGRADED = "degraded"
+    REJECTED = "rejected"
+
+    def __init__(self, max_concurrent=8, max_degraded=16, queue_wait=0.05):
+        self.max_concurrent = max_concurrent
+        self.max_degraded = max_degraded
+        self.queue_wait = queue_wait
+        self._full = threading.BoundedSemaphore(max_concurrent)
+        self._degraded = threading.BoundedSemaphore(max_degraded)
+        self._lock = threading.Lock()
+        self._stats = {"active": 0, "degraded_active": 0, "admitted": 0, "degraded": 0, "rejected": 0}
+
+    def _count(self, key, delta=1):
+        with self._lock:
+            self._stats[key] += delta
+
+    @contextmanager
+    def admit(self):
+        """Kısa bir süre tam kapasite için bekle; dolu ise kısıtlı yola, o da doluysa reddet"""
+        if self._full.acquire(timeout=self.queue_wait):
+            self._count("admitted")
+            self._count("active")
+            try:
+                yield self.FULL
+            finally:
+                self._count("active", -1)
+                self._full.release()
+            return
+
+        if self._degraded.acquire(blocking=False):
+            self._count("degraded")
+            self._count("degraded_active")
+            try:
+                yield self.DEGRADED
+            finally:
+                self._count("degraded_active", -1)
+                self._degraded.release()
+            return
+
+        self._count("rejected")
+        yield self.REJECTED
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["max_concurrent"] = self.max_concurrent
+        stats["max_degraded"] = self.max_degraded
+        return stats
@@ -1,15 +1,21 @@
 from flask import Flask, request, jsonify
-import pandas as pd
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.preprocessing import MinMaxScaler
-import requests
-import joblib
+import importlib
 import os
+import hashlib
+import json
 import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
 from datetime import datetime
 from dotenv import load_dotenv
+from cache import create_cache
+from tmdb_client import TMDBClient, TMDBError
+from person_index import PersonIndex
+from store import DEFAULT_STORE_PATH, RecommendationStore, likes_fingerprint
+from admission import AdmissionController, Deadline, parse_timeout_header
+from warmup import CacheWarmer
 
 
 load_dotenv()
@@ -17,17 +23,95 @@ load_dotenv()
 TMDB_API_KEY = os.getenv('TMDB_API_KEY', 'your_tmdb_api_key_here')
 TMDB_BASE_URL = 'https://api.themoviedb.org/3'
 
-def get_tmdb_movies_by_genres(genre_ids, page=1, limit=20):
+# Tüm TMDB çağrıları için paylaşılan istemci (connection pool + rate limit + breaker)
+tmdb = TMDBClient(
+    TMDB_API_KEY,
+    TMDB_BASE_URL,
+    rate=float(os.getenv('TMDB_RATE_LIMIT', 40)),  # istek/saniye
+    burst=int(os.getenv('TMDB_RATE_BURST', 40)),
+    max_retries=int(os.getenv('TMDB_MAX_RETRIES', 3)),
+    failure_threshold=int(os.getenv('TMDB_BREAKER_THRESHOLD', 5)),
+    reset_timeout=float(os.getenv('TMDB_BREAKER_RESET', 30))
+)
+
+CACHE_TTL = int(os.getenv('ML_CACHE_TTL', 6 * 3600))  # saniye
+
+# Aday havuzu - discover sayfaları paralel çekilir
+DISCOVER_PAGES = int(os.getenv('TMDB_DISCOVER_PAGES', 3))
+CANDIDATE_POOL_SIZE = int(os.getenv('ML_CANDIDATE_POOL_SIZE', 300))
+discover_executor = ThreadPoolExecutor(max_workers=int(os.getenv('TMDB_DISCOVER_WORKERS', 8)),
+                                       thread_name_prefix='tmdb-discover')
+
+# İki aşamalı sıralama - beğenilen film başına en fazla K aday için detay (credits) çekilir;
+# kişi indeksinden gelen adaylar da bu bütçeden düşer
+RERANK_TOP_K = int(os.getenv('ML_RERANK_TOP_K', 8))
+PERSON_CANDIDATES = int(os.getenv('ML_PERSON_CANDIDATES', 3))
+
+# MMR çeşitlilik ağırlığı (0 = saf skor sıralaması) - istek başına 'diversity' ile değiştirilebilir
+DEFAULT_DIVERSITY = float(os.getenv('ML_DIVERSITY', 0.3))
+details_executor = ThreadPoolExecutor(max_workers=int(os.getenv('TMDB_DETAILS_WORKERS', 8)),
+                                      thread_name_prefix='tmdb-details')
+
+# TMDB cevap cache'leri (aday listeleri + film detayları) ve kullanıcı profilleri
+# ML_CACHE_BACKEND=sqlite|redis ile aynı makinedeki tüm worker'lar paylaşır
+candidate_cache = create_cache('candidates', max_size=2000, ttl=CACHE_TTL)
+DETAILS_CACHE_SIZE = int(os.getenv('ML_DETAILS_CACHE_SIZE', 5000))
+details_cache = create_cache('details', max_size=DETAILS_CACHE_SIZE, ttl=CACHE_TTL)
+profile_cache = create_cache('profiles', max_size=10000, ttl=int(os.getenv('ML_PROFILE_CACHE_TTL', 3600)))
+
+# TMDB erişilemezken kullanılan offline havuz - cache'ten genre başına kurulur, kısa süre memoize edilir
+OFFLINE_POOL_TTL = int(os.getenv('ML_OFFLINE_POOL_TTL', 60))  # saniye
+OFFLINE_POOL_PER_GENRE = int(os.getenv('ML_OFFLINE_POOL_PER_GENRE', 500))
+offline_pool = {"built_at": 0.0, "by_genre": {}}
+offline_pool_lock = threading.Lock()
+
+# Import anında değil, ilk kullanımda ya da warmup'ta yüklenen modüller
+HEAVY_MODULES = ['numpy', 'diversity']
+
+# İstek zaman bütçesi (X-Request-Timeout-Ms başlığı) ve eşzamanlılık sınırı
+DEFAULT_REQUEST_TIMEOUT = float(os.getenv('ML_REQUEST_TIMEOUT', 25))  # saniye
+MAX_REQUEST_TIMEOUT = float(os.getenv('ML_MAX_REQUEST_TIMEOUT', 60))
+admission = AdmissionController(
+    max_concurrent=int(os.getenv('ML_MAX_CONCURRENT', 8)),
+    max_degraded=int(os.getenv('ML_MAX_DEGRADED', 16)),
+    queue_wait=float(os.getenv('ML_ADMISSION_WAIT', 0.05))
+)
+
+# ALS modeli (factorization.py ile offline eğitilir) - ilk kullanımda yüklenir
+ALS_MODEL_DIR = os.getenv('ML_ALS_MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'als'))
+als_model = None
+als_model_error = None
+als_model_failure = None  # (zaman, artifact imzası) - başarısız yüklemeden sonra ne zaman tekrar denenecek
+als_model_lock = threading.Lock()
+ALS_RETRY_INTERVAL = int(os.getenv('ML_ALS_RETRY_INTERVAL', 60))  # saniye
+# Modelde olmayan yeni filmler delta segmentinde tutulur, arka planda yeni sürüme birleştirilir
+ALS_DELTA_MIN_SUPPORT = int(os.getenv('ML_ALS_DELTA_MIN_SUPPORT', 2))
+ALS_COMPACT_THRESHOLD = int(os.getenv('ML_ALS_COMPACT_THRESHOLD', 500))
+ALS_COMPACT_INTERVAL = int(os.getenv('ML_ALS_COMPACT_INTERVAL', 3600))  # saniye, 0 = sadece eşikte
+
+# precompute.py ile gece hesaplanan öneriler - varsa /ml/recommend önce buraya bakar
+PRECOMPUTED_MAX_AGE = int(os.getenv('ML_PRECOMPUTED_MAX_AGE', 36 * 3600))  # saniye
+# Servis ilk gece job'ından önce başlamış olabilir - depo ilk bulunduğunda açılır
+precomputed_store = None
+precomputed_store_lock = threading.Lock()
+
+# Credits cache'inden beslenen kişi indeksi (yönetmen/oyuncu eşleşmeleri için)
+person_index = PersonIndex(max_movies=DETAILS_CACHE_SIZE)
+
+def get_tmdb_movies_by_genres(genre_ids, page=1, limit=20, deadline=None):
     """TMDB'den genre ID'lerine göre film getir"""
     try:
         if not genre_ids:
             return []
-            
-        genre_str = ','.join(map(str, genre_ids))
-        url = f"{TMDB_BASE_URL}/discover/movie"
+
+        # Genre sırası sonucu değiştirmez (AND), anahtarı sıralı tut
+        cache_key = (tuple(sorted(genre_ids)), page)
+        cached = candidate_cache.get(cache_key)
+        if cached is not None:
+            return [dict(movie) for movie in cached[:limit]]
+
         params = {
-            'api_key': TMDB_API_KEY,
-            'with_genres': genre_str,
+            'with_genres': ','.join(map(str, genre_ids)),
             'page': page,
             'sort_by': 'popularity.desc',
             'language': 'en-US',
@@ -36,38 +120,123 @@ def get_tmdb_movies_by_genres(genre_ids, page=1, limit=20):
             'primary_release_date.lte': '2024-12-31',  # 2024'e kadar
             'with_original_language': 'en'  # Sadece İngilizce
         }
-        
-        response = requests.get(url, params=params, timeout=10)
-        if response.status_code == 200:
-            movies = response.json().get('results', [])
-            print(f"✅ TMDB: {len(movies)} film alındı")
-            return movies[:limit]
-        else:
-            print(f"❌ TMDB API error: {response.status_code}")
-            return []
+
+        movies = tmdb.get('/discover/movie', params, deadline=deadline).get('results', [])
+        print(f"✅ TMDB: {len(movies)} film alındı")
+        candidate_cache.set(cache_key, movies)
+        # Çağıran taraf filmleri güncelliyor, cache'i kirletmemek için kopya dön
+        return [dict(movie) for movie in movies[:limit]]
+    except TMDBError as e:
+        print(f"❌ {e} - cache/offline adaylara geçiliyor")
+        stale = candidate_cache.get_stale(cache_key)
+        if stale is not None:
+            return [dict(movie) for movie in stale[:limit]]
+        return get_offline_candidates(genre_ids, limit)
     except Exception as e:
         print(f"❌ TMDB request error: {e}")
         return []
-    
-def get_tmdb_movie_details(movie_id):
+
+def get_offline_pool():
+    """Cache'teki tüm discover sonuçlarından genre → en popüler filmler indeksi (memoize)"""
+    with offline_pool_lock:
+        # Kilit altında kur - degrade anında eşzamanlı istekler cache'i tekrar tekrar taramasın
+        if time.time() - offline_pool["built_at"] < OFFLINE_POOL_TTL:
+            return offline_pool["by_genre"]
+
+        seen = set()
+        by_genre = {}
+        for movies in candidate_cache.values():
+            for movie in movies:
+                if movie['id'] in seen:
+                    continue
+                seen.add(movie['id'])
+                for genre_id in movie.get('genre_ids', []):
+                    by_genre.setdefault(genre_id, []).append(movie)
+
+        for genre_id, movies in by_genre.items():
+            movies.sort(key=lambda m: m.get('popularity') or 0, reverse=True)
+            del movies[OFFLINE_POOL_PER_GENRE:]
+
+        offline_pool.update(built_at=time.time(), by_genre=by_genre)
+        print(f"📦 Offline aday havuzu kuruldu: {len(seen)} film, {len(by_genre)} tür")
+        return by_genre
+
+def get_offline_candidates(genre_ids, limit=20, pool=None):
+    """TMDB erişilemezken offline havuzdan (genre örtüşmesi, popülerlik) aday üret"""
+    pool = get_offline_pool() if pool is None else pool
+    wanted = set(genre_ids)
+    candidates = {}
+    for genre_id in wanted:
+        for movie in pool.get(genre_id, ()):
+            candidates.setdefault(movie['id'], movie)
+
+    scored = sorted(
+        candidates.values(),
+        key=lambda m: (len(wanted & set(m.get('genre_ids', []))), m.get('popularity') or 0),
+        reverse=True
+    )
+    return [dict(movie) for movie in scored[:limit]]
+
+def get_discover_queries(genre_ids, pages=3, subset_pages=2, max_queries=12):
+    """Aday havuzu için (genre alt kümesi, sayfa) sorgu listesi oluştur"""
+    genre_ids = sorted(set(genre_ids))
+    queries = [(genre_ids, page) for page in range(1, pages + 1)]
+
+    # Tüm türleri birden içeren film az olabilir - bir eksik alt kümelerle genişlet
+    if len(genre_ids) > 1:
+        for subset in combinations(genre_ids, len(genre_ids) - 1):
+            queries.extend((list(subset), page) for page in range(1, subset_pages + 1))
+
+    return queries[:max_queries]
+
+def get_tmdb_candidate_pool(genre_ids, pages=None, max_candidates=None, deadline=None):
+    """Birden fazla discover sayfası + genre alt kümesini paralel çekip tekil aday havuzu oluştur"""
+    if not genre_ids:
+        return []
+
+    pages = pages or DISCOVER_PAGES
+    max_candidates = max_candidates or CANDIDATE_POOL_SIZE
+    queries = get_discover_queries(genre_ids, pages=pages)
+
+    # Her sayfa get_tmdb_movies_by_genres içinde ayrı cache'lenir
+    results = discover_executor.map(lambda query: get_tmdb_movies_by_genres(query[0], query[1], deadline=deadline),
+                                    queries)
+
+    wanted = set(genre_ids)
+    pool = {}
+    for movies in results:
+        for movie in movies:
+            pool.setdefault(movie['id'], movie)
+
+    candidates = sorted(
+        pool.values(),
+        key=lambda m: (len(wanted & set(m.get('genre_ids', []))), m.get('popularity', 0)),
+        reverse=True
+    )
+    print(f"🗂️ Aday havuzu: {len(queries)} sorgu → {len(candidates)} tekil film")
+    return candidates[:max_candidates]
+
+def get_tmdb_movie_details(movie_id, deadline=None):
     """TMDB'den film detaylarını al"""
     try:
-        url = f"{TMDB_BASE_URL}/movie/{movie_id}"
-        params = {
-            'api_key': TMDB_API_KEY,
-            'append_to_response': 'credits,keywords'
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"❌ TMDB details error: {response.status_code}")
-            return None
+        cached = details_cache.get(movie_id)
+        if cached is not None:
+            # Paylaşılan cache'te başka bir worker çekmiş olabilir - indekste yoksa ekle
+            if not person_index.has_movie(movie_id):
+                person_index.add_movie(movie_id, cached)
+            return cached
+
+        details = tmdb.get(f'/movie/{movie_id}', {'append_to_response': 'credits,keywords'}, deadline=deadline)
+        details_cache.set(movie_id, details)
+        person_index.add_movie(movie_id, details)
+        return details
+    except TMDBError as e:
+        print(f"❌ TMDB details error: {e}")
+        return details_cache.get_stale(movie_id)
     except Exception as e:
         print(f"❌ TMDB details error: {e}")
         return None
-    
+
 
 # Genre ilişkileri haritası - TMDB genre ID'lerine göre
 GENRE_RELATIONSHIPS = {
@@ -104,20 +273,102 @@ app = Flask(__name__)
 
 print("🚀 Python ML Recommendation Service starting...")
 
-def generate_tmdb_based_recommendations_v2(movie_genre_ids, original_title, detailed_analysis, original_movie_data=None):
+def preload_heavy_modules():
+    """Ağır modülleri ve model artifact'larını istek yolundan önce (warmup'ta) yükle"""
+    for module in HEAVY_MODULES:
+        importlib.import_module(module)
+    if os.path.exists(ALS_MODEL_DIR):
+        get_als_model()
+    print(f"📦 Ağır modüller yüklendi: {', '.join(HEAVY_MODULES)}")
+
+# Cache warmup - deploy sonrası ilk isteklerin TMDB'ye soğuk gitmemesi için
+WARMUP_ENABLED = os.getenv('ML_WARMUP_ENABLED', 'true').lower() == 'true'
+warmer = CacheWarmer(
+    get_tmdb_movies_by_genres,
+    get_tmdb_movie_details,
+    GENRE_RELATIONSHIPS,
+    top_combinations=int(os.getenv('ML_WARMUP_TOP_COMBINATIONS', 30)),
+    top_details=int(os.getenv('ML_WARMUP_TOP_DETAILS', 100)),
+    pages=DISCOVER_PAGES,
+    preload=preload_heavy_modules,
+    concurrency=int(os.getenv('ML_WARMUP_CONCURRENCY', 4)),
+    rate=float(os.getenv('ML_WARMUP_RATE', 10)),  # istek/saniye
+    interval=int(os.getenv('ML_WARMUP_INTERVAL', 0))  # saniye, 0 = sadece startup
+)
+
+def get_liked_movie_people(movie_data, deadline=None):
+    """Beğenilen filmin (yönetmen, oyuncu) ID'leri: kişi indeksi → cache'li TMDB detayı → istemci credits"""
+    if not movie_data:
+        return [], []
+    try:
+        movie_id = int(movie_data.get('movieId'))
+    except (TypeError, ValueError):
+        movie_id = None
+
+    if movie_id is not None:
+        people = person_index.people_for(movie_id)
+        if people is None and get_tmdb_movie_details(movie_id, deadline):
+            # Detay çekilirken (ya da cache'ten okunurken) indekse eklendi
+            people = person_index.people_for(movie_id)
+        if people is not None:
+            return people
+
+    return ([director['id'] for director in movie_data.get('directors', []) if isinstance(director, dict)],
+            [actor['id'] for actor in movie_data.get('cast', []) if isinstance(actor, dict)])
+
+def prescore_candidates(movie_genre_ids, candidates, detailed_analysis, top_k=None):
+    """1. aşama: sadece discover verisiyle (genre, puan, popülerlik) ucuz ön skorlama"""
+    top_k = top_k or RERANK_TOP_K
+    scored = []
+
+    for movie in candidates:
+        genre_score = calculate_genre_similarity_score(movie_genre_ids, movie.get('genre_ids', []), detailed_analysis)
+        if genre_score <= 0:
+            continue
+        # Eşit genre skorunda daha yüksek puanlı / popüler filmler öne
+        scored.append((genre_score, movie.get('vote_average') or 0, movie.get('popularity') or 0, movie))
+
+    scored.sort(key=lambda item: item[:3], reverse=True)
+    print(f"   ⚡ Ön skorlama: {len(candidates)} aday → {len(scored)} genre eşleşmesi, ilk {top_k} detaya gidiyor")
+    return [movie for *_, movie in scored[:top_k]]
+
+def generate_tmdb_based_recommendations_v2(movie_genre_ids, original_title, detailed_analysis, original_movie_data=None,
+                                           deadline=None):
     """Gelişmiş TMDB önerileri - yönetmen & oyuncu destekli (V2)"""
     
     recommendations = []
     
-    # TMDB'den DETAYLI filmleri al
-    tmdb_movies = get_tmdb_movies_by_genres_with_details(movie_genre_ids, limit=15)
+    # 1. AŞAMA: geniş aday havuzunu detay çekmeden ön skorla
+    candidates = get_tmdb_candidate_pool(movie_genre_ids, deadline=deadline)
+    survivors = prescore_candidates(movie_genre_ids, candidates, detailed_analysis)
+
+    # Orijinal filmin yönetmen ve oyuncu ID'lerini al (istemci credits göndermiyor - indeksten/TMDB'den)
+    original_director_ids, original_actor_ids = get_liked_movie_people(original_movie_data, deadline)
+
+    # "Aynı yönetmen/oyuncudan" adaylar - discover gerektirmez, kişi indeksinden gelir
+    survivor_ids = {movie['id'] for movie in survivors}
+    exclude = set(survivor_ids)
+    if original_movie_data and str(original_movie_data.get('movieId', '')).isdigit():
+        exclude.add(int(original_movie_data['movieId']))  # Node tarafı ID'yi string gönderebilir
+    person_movie_ids = person_index.movies_for(original_director_ids + original_actor_ids[:3], exclude=exclude)
+    person_candidates = sorted(person_index.movie_records(person_movie_ids),
+                               key=lambda m: m.get('popularity') or 0, reverse=True)[:PERSON_CANDIDATES]
+    if person_candidates:
+        print(f"   👥 Kişi indeksinden {len(person_candidates)} ek aday")
+        # Detay bütçesi sabit - kişi adayları en zayıf ön skorlu adayların yerini alır
+        survivors = survivors[:max(0, RERANK_TOP_K - len(person_candidates))]
+
+    # 2. AŞAMA: sadece hayatta kalanlar için credits çek ve yeniden sırala
+    if deadline is None or deadline.check("details"):
+        # Her çağrı kalan bütçeyle sınırlı - süre bitince kuyruktakiler TMDB'ye gitmeden stale cache'e düşer
+        tmdb_movies = list(details_executor.map(lambda movie: attach_movie_details(movie, deadline),
+                                                survivors + person_candidates))
+    else:
+        # Bütçe bitti - detaysız, sadece genre skoruyla devam
+        tmdb_movies = survivors
     
     print(f"🔍 {len(tmdb_movies)} detaylı TMDB filmi analiz ediliyor...")
     
-    # Orijinal filmin yönetmen ve oyuncu ID'lerini al
-    original_director_ids = [director['id'] for director in original_movie_data.get('directors', [])] if original_movie_data else []
-    original_actor_ids = [actor['id'] for actor in original_movie_data.get('cast', [])] if original_movie_data else []
-    
     for i, movie in enumerate(tmdb_movies):
         # Genre ID'leri al
         tmdb_genre_ids = movie.get('genre_ids', [])
@@ -205,8 +456,11 @@ def calculate_detailed_similarity_score(user_genres, user_directors, user_actors
     
     return final_score
 
-def get_person_name(person_id, people_list):
-    """People listesinden ID'ye göre isim bul"""
+def get_person_name(person_id, people_list=()):
+    """ID'ye göre kişi ismini bul - önce kişi indeksi (O(1)), yoksa listeden"""
+    name = person_index.name(person_id, None)
+    if name:
+        return name
     for person in people_list:
         if person.get('id') == person_id:
             return person.get('name', 'Unknown')
@@ -218,22 +472,16 @@ def calculate_person_similarity(user_people, movie_people, affinity_scores):
     if not user_people or not movie_people:
         return 0.0
     
-    score = 0.0
-    matches = 0
-    
-    # user_people ve movie_people artık ID listesi
-    for user_person_id in user_people:
-        user_affinity = affinity_scores.get(user_person_id, {}).get("score", 0.3)
-        
-        for movie_person_id in movie_people:
-            if user_person_id == movie_person_id:  # Aynı kişi
-                score += 1.0 * user_affinity
-                matches += 1
-                print(f"         ✅ Ortak kişi bulundu! Skor: {1.0 * user_affinity:.2f}")
-                break  # Aynı kişiyi tekrar sayma
-    
-    if matches == 0:
+    # user_people ve movie_people ID listesi - ortak kişiler küme kesişimi
+    common_people = set(user_people) & set(movie_people)
+    if not common_people:
         return 0.0
+
+    score = 0.0
+    for person_id in common_people:
+        user_affinity = affinity_scores.get(person_id, {}).get("score", 0.3)
+        score += 1.0 * user_affinity
+        print(f"         ✅ Ortak kişi bulundu! Skor: {1.0 * user_affinity:.2f}")
     
     # Ortalama skor
     return min(1.0, score / len(user_people))
@@ -284,62 +532,48 @@ def extract_actors_from_credits(credits_data, max_actors=5):
     
     return actors
 
-def get_tmdb_movies_by_genres_with_details(genre_ids, page=1, limit=20):
-    """TMDB'den filmleri + DETAYLI bilgilerle getir"""
-    try:
-        # Önce temel filmleri al
-        movies = get_tmdb_movies_by_genres(genre_ids, page, limit)
-        
-        # Her film için detaylı bilgi al
-        detailed_movies = []
-        for movie in movies:
-            print(f"🔍 Detaylı bilgi alınıyor: {movie['title']}")
-            details = get_tmdb_movie_details(movie['id'])
-            
-            if details:
-                # Yönetmen ve oyuncuları çıkar
-                credits = details.get('credits', {})
-                directors = extract_directors_from_credits(credits)
-                actors = extract_actors_from_credits(credits)
-                
-                # Temel bilgileri koru, detayları ekle
-                movie.update({
-                    'credits': credits,
-                    'directors': directors,
-                    'cast': actors,
-                    'keywords': details.get('keywords', {}),
-                    'runtime': details.get('runtime', 0)
-                })
-                print(f"✅ {movie['title']} - {len(directors)} yönetmen, {len(actors)} oyuncu")
-            else:
-                # Detay alınamazsa boş ekle
-                movie.update({
-                    'directors': [],
-                    'cast': [],
-                    'keywords': {}
-                })
-                print(f"⚠️ {movie['title']} - detay alınamadı")
-            
-            detailed_movies.append(movie)
-        
-        return detailed_movies
-    except Exception as e:
-        print(f"❌ TMDB details error: {e}")
-        return movies  # Detaylar olmasa da temel filmleri döndür
+def attach_movie_details(movie, deadline=None):
+    """Filme TMDB detaylarını (yönetmen, oyuncu, keyword) ekle"""
+    print(f"🔍 Detaylı bilgi alınıyor: {movie['title']}")
+    details = get_tmdb_movie_details(movie['id'], deadline)
+
+    if details:
+        # Yönetmen ve oyuncuları çıkar
+        credits = details.get('credits', {})
+        directors = extract_directors_from_credits(credits)
+        actors = extract_actors_from_credits(credits)
+
+        # Temel bilgileri koru, detayları ekle
+        movie.update({
+            'credits': credits,
+            'directors': directors,
+            'cast': actors,
+            'keywords': details.get('keywords', {}),
+            'runtime': details.get('runtime', 0)
+        })
+        print(f"✅ {movie['title']} - {len(directors)} yönetmen, {len(actors)} oyuncu")
+    else:
+        # Detay alınamazsa boş ekle
+        movie.update({
+            'directors': [],
+            'cast': [],
+            'keywords': {}
+        })
+        print(f"⚠️ {movie['title']} - detay alınamadı")
+
+    return movie
 
 def generate_detailed_reason_v2(user_genres, user_director_ids, user_actor_ids,
                            movie_genres, movie_director_ids, movie_actor_ids, 
                            original_title, original_movie_data, movie_data):
     """Gelişmiş öneri nedeni metni (V2)"""
     
-    # İsimleri al
-    user_director_names = [get_person_name(pid, original_movie_data.get('directors', [])) for pid in user_director_ids]
-    movie_director_names = [get_person_name(pid, movie_data.get('directors', [])) for pid in movie_director_ids]
-    user_actor_names = [get_person_name(pid, original_movie_data.get('cast', [])) for pid in user_actor_ids[:3]]
-    movie_actor_names = [get_person_name(pid, movie_data.get('cast', [])) for pid in movie_actor_ids[:3]]
-    
-    common_directors = set(user_director_names) & set(movie_director_names)
-    common_actors = set(user_actor_names) & set(movie_actor_names)
+    # Ortak kişiler ID kesişimiyle, isimler kişi indeksinden
+    common_director_ids = set(user_director_ids) & set(movie_director_ids)
+    common_actor_ids = set(user_actor_ids[:3]) & set(movie_actor_ids[:3])
+
+    common_directors = {get_person_name(pid, movie_data.get('directors', [])) for pid in common_director_ids}
+    common_actors = {get_person_name(pid, movie_data.get('cast', [])) for pid in common_actor_ids}
     
     reasons = []
     
@@ -371,7 +605,15 @@ def generate_detailed_reason_v2(user_genres, user_director_ids, user_actor_ids,
 
 def analyze_user_detailed_preferences(liked_movies):
     """Kullanıcının genre + yönetmen + oyuncu tercihlerini analiz et"""
-    
+
+    # Aynı beğeni listesi için profil bir kez hesaplanır (worker'lar arası paylaşılabilir)
+    # Sadece ID'ler değil tür/kişi bilgisi de değişebilir - tüm içerikten anahtar üret
+    cache_key = hashlib.sha1(json.dumps(liked_movies, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    cached = profile_cache.get(cache_key)
+    if cached is not None:
+        print("⚡ Kullanıcı profili cache'ten alındı")
+        return cached
+
     analysis = {
         "primary_genres": {},
         "secondary_genres": {}, 
@@ -409,6 +651,7 @@ def analyze_user_detailed_preferences(liked_movies):
                 director_id = hash(director_name)  # Geçici ID
             
             if director_name:
+                person_index.add_person(director_id, director_name, "director")
                 analysis["directors"][director_id] = {
                     "name": director_name,
                     "count": analysis["directors"].get(director_id, {"count": 0})["count"] + 1
@@ -425,6 +668,7 @@ def analyze_user_detailed_preferences(liked_movies):
                 actor_id = hash(actor_name)  # Geçici ID
             
             if actor_name:
+                person_index.add_person(actor_id, actor_name, "actor")
                 analysis["actors"][actor_id] = {
                     "name": actor_name,
                     "count": analysis["actors"].get(actor_id, {"count": 0})["count"] + 1
@@ -437,7 +681,8 @@ def analyze_user_detailed_preferences(liked_movies):
     
     print(f"🎭 Detaylı Analiz: {len(analysis['primary_genres'])} tür, "
           f"{len(analysis['directors'])} yönetmen, {len(analysis['actors'])} oyuncu")
-    
+
+    profile_cache.set(cache_key, analysis)
     return analysis
 
 def calculate_person_affinity(people_dict, total_movies):
@@ -559,13 +804,13 @@ def get_genre_name_by_id(genre_id):
     }
     return genre_map.get(genre_id)
 
-def generate_tmdb_based_recommendations(movie_genre_ids, original_title, genre_analysis):
+def generate_tmdb_based_recommendations(movie_genre_ids, original_title, genre_analysis, deadline=None):
     """TMDB'den gerçek filmlerle öneri oluştur - DÜZELTİLMİŞ"""
     
     recommendations = []
     
-    # TMDB'den filmleri al
-    tmdb_movies = get_tmdb_movies_by_genres(movie_genre_ids, limit=15)
+    # TMDB'den çok sayfalı aday havuzunu al
+    tmdb_movies = get_tmdb_candidate_pool(movie_genre_ids, deadline=deadline)
     
     
     print(f"🔍 {len(tmdb_movies)} TMDB filmi analiz ediliyor...")
@@ -619,13 +864,13 @@ def generate_tmdb_based_recommendations(movie_genre_ids, original_title, genre_a
 
 
 
-def generate_genre_similar_recommendations(movie_genre_ids, original_title, genre_analysis, user_profile):
+def generate_genre_similar_recommendations(movie_genre_ids, original_title, genre_analysis, user_profile, deadline=None):
     """TMDB'den gerçek filmlerle genre-benzeri öneriler"""
     
     print(f"🎯 TMDB'den gerçek filmler aranıyor: {movie_genre_ids}")
     
     # Önce TMDB'den gerçek filmleri al
-    tmdb_recommendations = generate_tmdb_based_recommendations(movie_genre_ids, original_title, genre_analysis)
+    tmdb_recommendations = generate_tmdb_based_recommendations(movie_genre_ids, original_title, genre_analysis, deadline)
     
     if tmdb_recommendations:
         return tmdb_recommendations
@@ -731,7 +976,7 @@ def generate_genre_reason(user_genres, movie_genres, original_title, genre_analy
     ]
     return random.choice(fallback_reasons)
 
-def get_genre_based_recommendations(user_profile, liked_movies, top_n=30):
+def get_genre_based_recommendations(user_profile, liked_movies, top_n=30, diversity=None, deadline=None):
     """Genre analizine dayalı akıllı öneriler - DÜZELTİLMİŞ"""
     
     genre_analysis = analyze_user_genre_preferences(liked_movies)
@@ -741,6 +986,9 @@ def get_genre_based_recommendations(user_profile, liked_movies, top_n=30):
     
     # ✅ DÜZELTİLDİ: TÜM beğenilen filmleri kullan
     for liked_movie in liked_movies:
+        if deadline is not None and not deadline.check("genre"):
+            break
+
         movie_id = liked_movie.get('movieId')
         title = liked_movie.get('title', 'Unknown')
         
@@ -766,20 +1014,60 @@ def get_genre_based_recommendations(user_profile, liked_movies, top_n=30):
         
         # Genre-benzeri öneriler oluştur
         genre_recommendations = generate_genre_similar_recommendations(
-            movie_genre_ids, title, genre_analysis, user_profile
+            movie_genre_ids, title, genre_analysis, user_profile, deadline=deadline
         )
         recommendations.extend(genre_recommendations)
     
     # Tekrar edenleri kaldır ve sırala
     unique_recommendations = remove_duplicate_recommendations(recommendations)
     
-    # ✅ DÜZELTİLDİ: Direkt score'a göre sırala
-    final_recommendations = sorted(unique_recommendations, key=lambda x: x.get("score", 0), reverse=True)
+    # Skor + çeşitlilik dengesiyle (MMR) sırala
+    final_recommendations = diversify(unique_recommendations, top_n,
+                                       DEFAULT_DIVERSITY if diversity is None else diversity)
     
     print(f"✅ {len(final_recommendations)} genre-tabanlı öneri hazır ({len(liked_movies)} film analiz edildi)")
     return final_recommendations[:top_n]
 
-def get_detailed_based_recommendations(user_profile, liked_movies, top_n=30):
+def get_cached_genre_recommendations(liked_movies, top_n=30):
+    """Ucuz yol: TMDB'ye gitmeden sadece cache'teki adaylarla genre tabanlı öneri"""
+    genre_analysis = analyze_user_genre_preferences(liked_movies)
+    recommendations = []
+    # Havuz istek başına bir kez alınır; aynı tür kümesine sahip beğeniler adayları paylaşır
+    pool = get_offline_pool()
+    candidates_by_genres = {}
+
+    for liked_movie in liked_movies:
+        title = liked_movie.get('title', 'Unknown')
+        movie_genre_ids = [genre.get('id') if isinstance(genre, dict) else get_genre_id_by_name(str(genre))
+                           for genre in liked_movie.get('genres', [])]
+        movie_genre_ids = [genre_id for genre_id in movie_genre_ids if genre_id]
+        if not movie_genre_ids:
+            continue
+
+        genre_key = frozenset(movie_genre_ids)
+        if genre_key not in candidates_by_genres:
+            candidates_by_genres[genre_key] = get_offline_candidates(movie_genre_ids, limit=top_n, pool=pool)
+
+        for movie in candidates_by_genres[genre_key]:
+            score = calculate_genre_similarity_score(movie_genre_ids, movie.get('genre_ids', []), genre_analysis)
+            if score > 0.05:
+                recommendations.append({
+                    "movie_id": movie["id"],
+                    "title": movie["title"],
+                    "score": score,
+                    "source": "python_ml_cached",
+                    "reason": generate_genre_reason(movie_genre_ids, movie.get('genre_ids', []), title),
+                    "poster_path": movie.get("poster_path"),
+                    "vote_average": movie.get("vote_average"),
+                    "release_date": movie.get("release_date"),
+                    "overview": movie.get("overview"),
+                    "genre_ids": movie.get("genre_ids", [])
+                })
+
+    print(f"⚡ Cache'ten {len(recommendations)} genre-tabanlı öneri")
+    return remove_duplicate_recommendations(recommendations)[:top_n]
+
+def get_detailed_based_recommendations(user_profile, liked_movies, top_n=30, diversity=None, deadline=None):
     """Gelişmiş genre + yönetmen + oyuncu tabanlı öneriler"""
     
     detailed_analysis = analyze_user_detailed_preferences(liked_movies)
@@ -790,6 +1078,10 @@ def get_detailed_based_recommendations(user_profile, liked_movies, top_n=30):
     print(f"   🎭 Analiz: {len(detailed_analysis.get('primary_genres', {}))} tür, {len(detailed_analysis.get('directors', {}))} yönetmen")
     
     for liked_movie in liked_movies:
+        # Süre dolduysa o ana kadarki önerilerle devam
+        if deadline is not None and not deadline.check("discover"):
+            break
+
         movie_id = liked_movie.get('movieId')
         title = liked_movie.get('title', 'Unknown')
         
@@ -815,19 +1107,106 @@ def get_detailed_based_recommendations(user_profile, liked_movies, top_n=30):
             movie_genre_ids, 
             title, 
             detailed_analysis,
-            original_movie_data=liked_movie  # Tüm film detaylarını gönder
+            original_movie_data=liked_movie,  # Tüm film detaylarını gönder
+            deadline=deadline
         )
         recommendations.extend(detailed_recommendations)
     
     # Tekrar edenleri kaldır ve sırala
     unique_recommendations = remove_duplicate_recommendations(recommendations)
-    final_recommendations = sorted(unique_recommendations, key=lambda x: x.get("score", 0), reverse=True)
+    # Aynı türden filmler duvarı yerine skor + çeşitlilik dengesi (MMR)
+    final_recommendations = diversify(unique_recommendations, top_n,
+                                       DEFAULT_DIVERSITY if diversity is None else diversity)
     
     print(f"✅ {len(final_recommendations)} gelişmiş öneri hazır")
     return final_recommendations[:top_n]
 
 
-def generate_ml_recommendations(liked_movies):
+def get_precomputed_store():
+    """precompute.py deposunu dosya oluştuğu anda aç (o zamana kadar None)"""
+    global precomputed_store
+    if precomputed_store is None:
+        with precomputed_store_lock:
+            if precomputed_store is None:
+                precomputed_store = RecommendationStore.open_existing(DEFAULT_STORE_PATH)
+                if precomputed_store is not None:
+                    print(f"✅ Önceden hesaplanmış öneri deposu açıldı: {DEFAULT_STORE_PATH}")
+    return precomputed_store
+
+def als_artifact_signature():
+    """meta.json / CURRENT değişiklik zamanları - ilk eğitim ya da yeni sürüm yazılınca değişir"""
+    signature = []
+    for name in ('meta.json', 'CURRENT'):
+        try:
+            signature.append(os.stat(os.path.join(ALS_MODEL_DIR, name)).st_mtime_ns)
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+def should_retry_als_model():
+    """Başarısız yüklemeden sonra: artifact'lar değiştiyse hemen, değişmediyse cooldown sonunda"""
+    if als_model_failure is None:
+        return True
+    failed_at, signature = als_model_failure
+    return time.time() - failed_at >= ALS_RETRY_INTERVAL or als_artifact_signature() != signature
+
+def get_als_model():
+    """ALS indeksini (memory-mapped ana sürüm + delta) ilk kullanımda yükle"""
+    global als_model, als_model_error, als_model_failure
+    if als_model is None and should_retry_als_model():
+        with als_model_lock:
+            if als_model is None and should_retry_als_model():
+                try:
+                    from delta_index import IncrementalALSIndex  # numpy ilk kullanımda yüklenir
+                    als_model = IncrementalALSIndex(
+                        ALS_MODEL_DIR,
+                        min_support=ALS_DELTA_MIN_SUPPORT,
+                        compact_threshold=ALS_COMPACT_THRESHOLD,
+                        compact_interval=ALS_COMPACT_INTERVAL
+                    )
+                    als_model.start()
+                    als_model_error = als_model_failure = None
+                    print(f"✅ ALS modeli yüklendi: {len(als_model.base.item_ids):,} film ({als_model.version})")
+                except Exception as e:
+                    # Bozuk/eksik artifact servisi düşürmesin - ALS istekleri hibrit yola düşer
+                    als_model_error = f"{type(e).__name__}: {e}"
+                    als_model_failure = (time.time(), als_artifact_signature())
+                    print(f"⚠️ ALS modeli yüklenemedi ({ALS_MODEL_DIR}): {e}")
+    return als_model
+
+def get_als_recommendations(liked_movies, top_n=30, deadline=None):
+    """Matris faktörizasyonu (ALS) tabanlı öneriler"""
+    model = get_als_model()
+    if model is None:
+        return []
+
+    liked_ids = [movie.get('movieId') for movie in liked_movies if movie.get('movieId') is not None]
+    scored = model.recommend([int(movie_id) for movie_id in liked_ids], top_n=top_n)
+    print(f"🧮 ALS: {len(scored)} aday skorlandı")
+
+    # Başlık/poster için detaylar (cache'ten veya paralel TMDB)
+    details = details_executor.map(lambda movie_id: get_tmdb_movie_details(movie_id, deadline),
+                                   [movie_id for movie_id, _ in scored])
+    recommendations = []
+    for (movie_id, score), movie in zip(scored, details):
+        if not movie:
+            continue
+        recommendations.append({
+            "movie_id": movie_id,
+            "title": movie.get("title"),
+            "score": score,
+            "source": "python_ml_als",
+            "reason": "Users with similar taste liked this",
+            "poster_path": movie.get("poster_path"),
+            "vote_average": movie.get("vote_average"),
+            "release_date": movie.get("release_date"),
+            "overview": movie.get("overview"),
+            "genre_ids": [genre['id'] for genre in movie.get('genres', [])]
+        })
+
+    return recommendations
+
+def generate_ml_recommendations(liked_movies, diversity=None, deadline=None):
     """Gelişmiş ML önerileri - hem eski hem yeni sistem"""
     print("🎯 Gelişmiş ML önerileri hesaplanıyor...")
     
@@ -838,7 +1217,7 @@ def generate_ml_recommendations(liked_movies):
     try:
         # Önce gelişmiş sistemi dene (yönetmen + oyuncu)
         print("🚀 Gelişmiş sistem deneniyor (tür + yönetmen + oyuncu)...")
-        recommendations = get_detailed_based_recommendations({}, liked_movies)
+        recommendations = get_detailed_based_recommendations({}, liked_movies, diversity=diversity, deadline=deadline)
         
         if recommendations:
             print(f"✅ {len(recommendations)} gelişmiş öneri hazır")
@@ -846,15 +1225,20 @@ def generate_ml_recommendations(liked_movies):
         else:
             # Gelişmiş sistem çalışmazsa eski genre sistemine fallback
             print("⚠️ Gelişmiş sistem sonuç vermedi, genre-tabanlı sisteme geçiliyor...")
-            return get_genre_based_recommendations({}, liked_movies)
+            return get_genre_based_recommendations({}, liked_movies, diversity=diversity, deadline=deadline)
         
     except Exception as e:
         print(f"❌ Gelişmiş öneri hatası: {e}")
         # Hata durumunda eski genre sistemine fallback
         print("🔄 Genre-tabanlı sisteme fallback...")
-        return get_genre_based_recommendations({}, liked_movies)
+        return get_genre_based_recommendations({}, liked_movies, diversity=diversity, deadline=deadline)
     
 
+def diversify(recommendations, top_n, diversity):
+    """MMR yeniden sıralama - diversity (ve numpy) ilk kullanımda import edilir"""
+    from diversity import mmr_rerank
+    return mmr_rerank(recommendations, top_n, diversity)
+
 def remove_duplicate_recommendations(recommendations):
     """Tekrar eden önerileri kaldır"""
     seen = set()
@@ -874,15 +1258,27 @@ def remove_duplicate_recommendations(recommendations):
 
 @app.route('/ml/health', methods=['GET'])
 def health_check():
+    # Warmup bitene kadar 503 - load balancer hazır olmayı bekleyebilsin
+    ready = warmer.ready or not WARMUP_ENABLED
     return jsonify({
-        "status": "healthy",
-        "service": "Python ML Recommendation Service", 
+        "status": "healthy" if ready else "warming_up",
+        "ready": ready,
+        "service": "Python ML Recommendation Service",
         "version": "1.0.0",
-        "timestamp": datetime.now().isoformat()
-    })
+        "timestamp": datetime.now().isoformat(),
+        "warmup": warmer.progress() if WARMUP_ENABLED else {"status": "disabled"},
+        "caches": [candidate_cache.stats(), details_cache.stats(), profile_cache.stats()],
+        "tmdb": tmdb.stats(),
+        "admission": admission.stats(),
+        "person_index": person_index.stats(),
+        "als": als_model.stats() if als_model is not None else {"loaded": False, "error": als_model_error}
+    }), 200 if ready else 503
 
 @app.route('/ml/recommend', methods=['POST'])
 def get_recommendations():
+    # Bütçe isteğin geldiği andan itibaren işler - çağıran taraf vazgeçtikten sonra çalışmayalım
+    deadline = Deadline(parse_timeout_header(request.headers.get('X-Request-Timeout-Ms'),
+                                             DEFAULT_REQUEST_TIMEOUT, MAX_REQUEST_TIMEOUT))
     try:
         data = request.json
         user_id = data.get('user_id')
@@ -905,13 +1301,79 @@ def get_recommendations():
                 "message": "No liked movies for ML analysis"
             })
         
+
         # ML öneri algoritması
-        recommendations = generate_ml_recommendations(liked_movies)
+        algorithm = data.get('algorithm', 'hybrid_content_based')
+        diversity = data.get('diversity')
+        if diversity is not None:
+            try:
+                diversity = float(diversity)
+            except (TypeError, ValueError):
+                diversity = float('nan')
+            if diversity != diversity:  # NaN - sayıya çevrilemeyen değer dahil
+                return jsonify({
+                    "success": False,
+                    "error": "'diversity' must be a number between 0 and 1"
+                }), 400
+            diversity = min(1.0, max(0.0, diversity))
+
+        # Önceden hesaplanmış sonuç (beğeniler aynıysa ve özel çeşitlilik istenmediyse)
+        store = get_precomputed_store() if user_id is not None and diversity is None else None
+        if store is not None:
+            cached = store.get(user_id, likes_fingerprint(liked_movies), PRECOMPUTED_MAX_AGE)
+            if cached and cached["algorithm"] == algorithm:
+                print(f"⚡ Önceden hesaplanmış {len(cached['recommendations'])} öneri kullanılıyor")
+                return jsonify({
+                    "success": True,
+                    "recommendations": cached["recommendations"],
+                    "algorithm": algorithm,
+                    "precomputed": True,
+                    "user_id": user_id,
+                    "liked_movies_count": len(liked_movies),
+                    "count": len(cached["recommendations"])
+                })
+
+        degraded = False
+        with admission.admit() as mode:
+            if mode == AdmissionController.REJECTED:
+                print("🚫 Kapasite dolu, istek reddedildi")
+                return jsonify({
+                    "success": False,
+                    "error": "ML service overloaded, retry later"
+                }), 503, {"Retry-After": "1"}
+
+            # Kabul edilen istekteki beğeniler ALS indeksine etkileşim olarak işlenir
+            # (model yüklüyse - yüklemeyi tetiklemez; aynı beğeni listesi tekrar sayılmaz)
+            if als_model is not None:
+                als_model.record(user_id, [int(movie['movieId']) for movie in liked_movies
+                                           if movie.get('movieId') is not None])
+
+            recommendations = []
+            if mode == AdmissionController.DEGRADED:
+                # Kapasite dolu - TMDB'ye gitmeden cache'teki adaylarla cevap ver
+                print("⚠️ Kapasite dolu, cache'ten genre-tabanlı ucuz yola geçiliyor")
+                degraded = True
+                algorithm = 'cached_genre_only'
+                recommendations = get_cached_genre_recommendations(liked_movies)
+            else:
+                if algorithm == 'als':
+                    recommendations = get_als_recommendations(liked_movies, deadline=deadline)
+                    if not recommendations:
+                        print("⚠️ ALS sonuç vermedi, hibrit sisteme geçiliyor...")
+                if not recommendations:
+                    algorithm = 'hybrid_content_based'
+                    recommendations = generate_ml_recommendations(liked_movies, diversity=diversity, deadline=deadline)
+                if not recommendations and deadline.partial:
+                    # Bütçe hiçbir şey üretmeden bitti - en azından cache'ten cevap ver
+                    algorithm = 'cached_genre_only'
+                    recommendations = get_cached_genre_recommendations(liked_movies)
         
         return jsonify({
             "success": True,
             "recommendations": recommendations,
-            "algorithm": "hybrid_content_based",
+            "algorithm": algorithm,
+            "partial": deadline.partial,
+            "degraded": degraded,
             "user_id": user_id,
             "liked_movies_count": len(liked_movies),
             "count": len(recommendations)
@@ -924,6 +1386,10 @@ def get_recommendations():
             "error": str(e)
         }), 500
 
+# Debug reloader'ın ana sürecinde değil, isteklere cevap veren süreçte başlat
+if WARMUP_ENABLED and (__name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+    warmer.start()
+
 if __name__ == '__main__':
     print("✅ Python ML Service ready!")
     print("📡 Endpoints:")
@@ -0,0 +1,68 @@
+"""Soğuk başlangıç benchmark'ı: `import app` süresi ve worker başına temel bellek (RSS).
+
+Her ölçüm ayrı bir süreçte yapılır ki modül cache'i ölçümü bozmasın.
+    python bench_startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+HEAVY_MODULES = ['numpy', 'scipy', 'pandas', 'sklearn', 'joblib']
+
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import app
+elapsed = time.perf_counter() - started
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss_kb //= 1024  # macOS byte cinsinden döndürür
+print(json.dumps({
+    "import_seconds": elapsed,
+    "rss_mb": rss_kb / 1024,
+    "heavy_modules": [m for m in %r if m in sys.modules]
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_once():
+    env = dict(os.environ, ML_WARMUP_ENABLED='false')
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True, check=True
+    )
+    # app import sırasında log basıyor - son satır ölçüm
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ML servisinin import süresi ve bellek ölçümü")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help="Sonucu JSON olarak yazdır")
+    args = parser.parse_args()
+
+    samples = [measure_once() for _ in range(args.runs)]
+    report = {
+        "runs": args.runs,
+        "import_seconds_median": round(statistics.median(s["import_seconds"] for s in samples), 3),
+        "import_seconds_max": round(max(s["import_seconds"] for s in samples), 3),
+        "rss_mb_median": round(statistics.median(s["rss_mb"] for s in samples), 1),
+        "heavy_modules_at_import": samples[-1]["heavy_modules"]
+    }
+
+    if args.json:
+        print(json.dumps(report))
+        return
+
+    print(f"⏱️ import app: {report['import_seconds_median']}s (medyan), {report['import_seconds_max']}s (max)")
+    print(f"🧠 Worker temel RSS: {report['rss_mb_median']} MB")
+    print(f"📦 Import anında yüklenen ağır modüller: {report['heavy_modules_at_import'] or 'yok'}")
+
+
+if __name__ == '__main__':
+    main()
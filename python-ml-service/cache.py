@@ -0,0 +1,267 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheBackend:
+    """Cache arayüzü: TTL'li get/set + TMDB degrade olduğunda kullanılan stale okuma
+
+    Alt sınıflar sadece _load/_store/_values/_size/_clear metodlarını uygular.
+    Süreler duvar saatiyle (time.time) tutulur ki farklı süreçler aynı kaydı paylaşabilsin.
+    """
+
+    def __init__(self, name, max_size=1000, ttl=6 * 3600):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _count(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key, default=None):
+        entry = self._load(key)
+        if entry is None or entry[0] < time.time():
+            # Süresi dolmuş kayıt - TMDB degrade olursa get_stale ile hâlâ kullanılabilir
+            self._count(False)
+            return default
+        self._count(True)
+        return entry[1]
+
+    def get_stale(self, key, default=None):
+        """Süresi dolmuş olsa bile kayıtlı değeri döndür (degrade mod için)"""
+        entry = self._load(key)
+        return default if entry is None else entry[1]
+
+    def set(self, key, value, ttl=None):
+        self._store(key, time.time() + (self.ttl if ttl is None else ttl), value)
+
+    def values(self):
+        """Tüm kayıtların (stale dahil) anlık kopyası"""
+        return self._values()
+
+    def __contains__(self, key):
+        entry = self._load(key)
+        return entry is not None and entry[0] >= time.time()
+
+    def __len__(self):
+        return self._size()
+
+    def clear(self):
+        self._clear()
+
+    def stats(self):
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "name": self.name,
+            "backend": self.backend,
+            "size": len(self),
+            "max_size": self.max_size,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 3) if total else 0.0
+        }
+
+
+class MemoryCache(CacheBackend):
+    """Süreç içi, boyut sınırlı (LRU) cache"""
+
+    backend = "memory"
+
+    def __init__(self, name, max_size=1000, ttl=6 * 3600):
+        super().__init__(name, max_size, ttl)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def _store(self, key, expires_at, value):
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)  # En eski kaydı at
+
+    def _values(self):
+        with self._lock:
+            return [value for _, value in self._data.values()]
+
+    def _size(self):
+        with self._lock:
+            return len(self._data)
+
+    def _clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache(CacheBackend):
+    """Aynı makinedeki tüm worker süreçlerinin paylaştığı SQLite cache (WAL modu)"""
+
+    backend = "sqlite"
+    PRUNE_SLACK = 0.1  # Tablo max_size'ı bu oranda aşınca max_size'a kadar budanır
+
+    def __init__(self, name, path, max_size=1000, ttl=6 * 3600):
+        super().__init__(name, max_size, ttl)
+        self.path = path
+        self._local = threading.local()
+        self._prune_above = max_size + max(1, int(max_size * self.PRUNE_SLACK))
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    namespace TEXT NOT NULL,
+                    key BLOB NOT NULL,
+                    expires_at REAL NOT NULL,
+                    value BLOB NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+
+    def _connect(self):
+        # sqlite3 bağlantıları thread'ler arasında paylaşılamaz
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')  # Cache - fsync kaybı önemli değil
+            self._local.conn = conn
+        return conn
+
+    def _load(self, key):
+        row = self._connect().execute(
+            'SELECT expires_at, value FROM cache WHERE namespace = ? AND key = ?',
+            (self.name, pickle.dumps(key))
+        ).fetchone()
+        return None if row is None else (row[0], pickle.loads(row[1]))
+
+    def _store(self, key, expires_at, value):
+        conn = self._connect()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)',
+                         (self.name, pickle.dumps(key), expires_at, pickle.dumps(value)))
+        # Sayaç süreç başına olurdu - sınırı tüm worker'ların ortak satır sayısına göre uygula
+        if self._size() > self._prune_above:
+            self._prune()
+
+    def _prune(self):
+        """Boyut sınırını aşan kısımda süresi en erken dolacak kayıtları sil"""
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                DELETE FROM cache WHERE namespace = ? AND key IN (
+                    SELECT key FROM cache WHERE namespace = ?
+                    ORDER BY expires_at LIMIT max(0, (SELECT COUNT(*) FROM cache WHERE namespace = ?) - ?)
+                )
+            """, (self.name, self.name, self.name, self.max_size))
+
+    def _values(self):
+        rows = self._connect().execute('SELECT value FROM cache WHERE namespace = ?', (self.name,))
+        return [pickle.loads(value) for value, in rows]
+
+    def _size(self):
+        return self._connect().execute('SELECT COUNT(*) FROM cache WHERE namespace = ?', (self.name,)).fetchone()[0]
+
+    def _clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM cache WHERE namespace = ?', (self.name,))
+
+
+class RedisCache(CacheBackend):
+    """Redis uyumlu istemciyle çalışan cache
+
+    Sadece get / set(ex=) / delete / mget ve sorted set (zadd / zcard / zcount / zrange / zrem /
+    zremrangebyscore) komutları kullanılır; bu alt kümeyi sağlayan herhangi bir istemci (redis-py,
+    yerel bir stand-in) takılabilir. Namespace'in anahtarları, süre bitişine göre sıralı bir index
+    sorted set'inde tutulur: boyut SCAN yerine tek ZCOUNT ile okunur ve max_size tüm worker'lar için
+    SQLite'taki gibi (süresi en erken dolacak kayıtlar atılarak) uygulanır.
+    """
+
+    backend = "redis"
+    PRUNE_SLACK = 0.1  # Index max_size'ı bu oranda aşınca max_size'a kadar budanır
+
+    def __init__(self, name, client, max_size=1000, ttl=6 * 3600, stale_ttl=24 * 3600):
+        super().__init__(name, max_size, ttl)
+        self.client = client
+        self.stale_ttl = stale_ttl  # Süresi dolan kayıt bu kadar daha stale okuma için tutulur
+        self.prefix = f"ml:{name}:"
+        self.index_key = f"ml:{name}#index"  # anahtar → expires_at
+        self._prune_above = max_size + max(1, int(max_size * self.PRUNE_SLACK))
+
+    def _key(self, key):
+        return self.prefix + repr(key)
+
+    def _load(self, key):
+        raw = self.client.get(self._key(key))
+        return None if raw is None else pickle.loads(raw)
+
+    def _store(self, key, expires_at, value):
+        redis_key = self._key(key)
+        ttl = max(1, int(expires_at - time.time() + self.stale_ttl))
+        self.client.set(redis_key, pickle.dumps((expires_at, value)), ex=ttl)
+        self.client.zadd(self.index_key, {redis_key: expires_at})
+        if self.client.zcard(self.index_key) > self._prune_above:
+            self._prune()
+
+    def _prune(self):
+        """Redis'in TTL ile sildiği kayıtları index'ten çıkar, sınırı aşan kısmı en erken dolanlardan sil"""
+        self.client.zremrangebyscore(self.index_key, '-inf', time.time() - self.stale_ttl)
+        excess = self.client.zcard(self.index_key) - self.max_size
+        if excess > 0:
+            victims = self.client.zrange(self.index_key, 0, excess - 1)
+            if victims:
+                self.client.delete(*victims)
+                self.client.zrem(self.index_key, *victims)
+
+    def _keys(self):
+        return list(self.client.zrange(self.index_key, 0, -1))
+
+    def _values(self):
+        keys = self._keys()
+        if not keys:
+            return []
+        return [pickle.loads(raw)[1] for raw in self.client.mget(keys) if raw is not None]
+
+    def _size(self):
+        # Stale okuma süresi de geçmiş (Redis'in TTL ile sildiği) kayıtlar sayılmaz
+        return self.client.zcount(self.index_key, time.time() - self.stale_ttl, '+inf')
+
+    def _clear(self):
+        keys = self._keys()
+        if keys:
+            self.client.delete(*keys)
+        self.client.delete(self.index_key)
+
+
+def create_cache(name, max_size=1000, ttl=6 * 3600):
+    """ML_CACHE_BACKEND ortam değişkenine göre cache oluştur (memory | sqlite | redis)"""
+    backend = os.getenv('ML_CACHE_BACKEND', 'memory').lower()
+
+    if backend == 'sqlite':
+        path = os.getenv('ML_CACHE_PATH', os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), 'models', 'cache.sqlite3'))
+        return SQLiteCache(name, path, max_size=max_size, ttl=ttl)
+
+    if backend == 'redis':
+        import redis  # Opsiyonel bağımlılık - sadece redis backend'inde gerekli
+        client = redis.Redis.from_url(os.getenv('ML_REDIS_URL', 'redis://localhost:6379/0'))
+        return RedisCache(name, client, max_size=max_size, ttl=ttl)
+
+    return MemoryCache(name, max_size=max_size, ttl=ttl)
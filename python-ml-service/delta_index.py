@@ -0,0 +1,287 @@
+"""ALS indeksine artımlı güncelleme: memory-mapped ana sürüm + bellekte küçük delta segmenti.
+
+Modelde olmayan yeni filmler, beğeni listelerinden (aynı kullanıcının beğendiği bilinen
+filmlerin faktör ortalaması) delta segmentine eklenir ve sorgularda ana indeksle birlikte
+skorlanır. Arka plan compaction'ı delta'yı ana indeksle birleştirip yeni bir sürüm dizini
+yazar ve CURRENT dosyasını atomik olarak değiştirir - tam yeniden eğitim gerekmez.
+"""
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from factorization import CURRENT_FILE, ALSModel, resolve_model_dir, save_model
+
+
+VERSIONS_DIR = 'versions'
+LOCK_FILE = 'compaction.lock'
+
+
+class DeltaSegment:
+    """Henüz ana indekste olmayan filmlerin bellekteki faktör tahminleri"""
+
+    def __init__(self, factors, min_support=2, max_items=10000, max_supporters=1000):
+        self.factors = factors
+        self.min_support = min_support  # Sorgulara dahil olmak için gereken en az farklı kullanıcı
+        self.max_items = max_items
+        self.max_supporters = max_supporters  # Bu kadar kullanıcıdan sonra ortalama yeterince oturmuş sayılır
+        self.sums = {}        # movie_id → faktör toplamı
+        self.counts = {}      # movie_id → katkı veren kullanıcı sayısı
+        self.supporters = {}  # movie_id → {user_id, ...} - aynı kullanıcı iki kez sayılmaz
+        self.interactions = 0
+        self._lock = threading.Lock()
+        self._snapshot = None  # (ids, factors) - değişene kadar yeniden kurulmaz
+
+    def __len__(self):
+        """Sorgulara dahil olan (yeterli etkileşimi olan) film sayısı"""
+        with self._lock:
+            return sum(1 for count in self.counts.values() if count >= self.min_support)
+
+    def add(self, user_id, movie_ids, vector):
+        """Her yeni film için kullanıcının zevk vektörünü ekle (kullanıcı başına film başına bir kez)"""
+        with self._lock:
+            for movie_id in movie_ids:
+                if movie_id not in self.sums:
+                    if len(self.sums) >= self.max_items:
+                        continue
+                    self.sums[movie_id] = np.zeros(self.factors, dtype=np.float64)
+                    self.counts[movie_id] = 0
+                    self.supporters[movie_id] = set()
+                supporters = self.supporters[movie_id]
+                if user_id in supporters or len(supporters) >= self.max_supporters:
+                    continue
+                supporters.add(user_id)
+                self.sums[movie_id] += vector
+                self.counts[movie_id] += 1
+            self.interactions += 1
+            self._snapshot = None
+
+    def snapshot(self):
+        """Aktif delta filmleri - (ID dizisi, float32 faktör matrisi)"""
+        with self._lock:
+            if self._snapshot is None:
+                ids = [movie_id for movie_id, count in self.counts.items() if count >= self.min_support]
+                factors = np.array([self.sums[movie_id] / self.counts[movie_id] for movie_id in ids],
+                                   dtype=np.float32).reshape(len(ids), self.factors)
+                self._snapshot = (np.asarray(ids, dtype=np.int64), factors)
+            return self._snapshot
+
+    def discard(self, movie_ids):
+        """Ana indekse taşınan filmleri segmentten çıkar"""
+        with self._lock:
+            for movie_id in movie_ids:
+                self.sums.pop(int(movie_id), None)
+                self.counts.pop(int(movie_id), None)
+                self.supporters.pop(int(movie_id), None)
+            self._snapshot = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tracked": len(self.counts),
+                "active": sum(1 for count in self.counts.values() if count >= self.min_support),
+                "interactions": self.interactions
+            }
+
+
+class IncrementalALSIndex:
+    """Ana ALS sürümü + delta segmenti üzerinde sorgu, arka planda compaction"""
+
+    def __init__(self, model_dir, min_support=2, compact_threshold=500, compact_interval=3600,
+                 keep_versions=3, lock_timeout=600, max_users=100000):
+        self.model_dir = model_dir
+        self.compact_threshold = compact_threshold  # Bu kadar aktif delta filmde erken compaction
+        self.compact_interval = compact_interval    # saniye, 0 = sadece eşik dolunca
+        self.keep_versions = keep_versions
+        self.lock_timeout = lock_timeout            # Bu süreden eski kilit dosyası terk edilmiş sayılır
+        self.max_users = max_users
+        self._seen_likes = OrderedDict()            # user_id → son işlenen beğeni kümesi (LRU)
+        self._seen_lock = threading.Lock()
+        self.base = ALSModel.load(model_dir)
+        self.delta = DeltaSegment(self.base.item_factors.shape[1], min_support=min_support)
+        self.version = self._current_version()
+        self.compactions = 0
+        self.last_compaction = None
+        self._compact_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _current_version(self):
+        return os.path.relpath(resolve_model_dir(self.model_dir), self.model_dir)
+
+    def record(self, user_id, tmdb_ids):
+        """Kullanıcının beğeni listesini kaydet - modelde olmayan filmler delta'ya girer
+
+        Beğeniler değişmediyse (ör. sayfa yenileme) hiçbir şey yapılmaz; kimliksiz istekler sayılmaz.
+        """
+        if user_id is None:
+            return
+        likes = frozenset(tmdb_ids)
+        with self._seen_lock:
+            if self._seen_likes.get(user_id) == likes:
+                self._seen_likes.move_to_end(user_id)
+                return
+            self._seen_likes[user_id] = likes
+            self._seen_likes.move_to_end(user_id)
+            while len(self._seen_likes) > self.max_users:
+                self._seen_likes.popitem(last=False)
+
+        base = self.base
+        rows = [base.index[movie_id] for movie_id in tmdb_ids if movie_id in base.index]
+        new_ids = [movie_id for movie_id in tmdb_ids if movie_id not in base.index]
+        if not rows or not new_ids:
+            return
+
+        # Yeni filmin faktörü = onu beğenenlerin bildiğimiz zevklerinin ortalaması
+        vector = np.asarray(base.item_factors[rows], dtype=np.float64).mean(axis=0)
+        self.delta.add(user_id, new_ids, vector)
+
+        if self.compact_threshold and len(self.delta) >= self.compact_threshold:
+            self._wake.set()
+
+    def recommend(self, tmdb_ids, top_n=30):
+        """Ana indeks ve delta segmenti birlikte skorlanır, ilk N tek argpartition ile seçilir"""
+        base = self.base  # Compaction sırasında değişebilir - sorgu boyunca tek sürüm kullan
+        delta_ids, delta_factors = self.delta.snapshot()
+        delta_index = {int(movie_id): i for i, movie_id in enumerate(delta_ids)}
+
+        liked = set(tmdb_ids)
+        base_rows = [base.index[movie_id] for movie_id in tmdb_ids if movie_id in base.index]
+        delta_rows = [delta_index[movie_id] for movie_id in tmdb_ids
+                      if movie_id in delta_index and movie_id not in base.index]
+        if not base_rows and not delta_rows:
+            return []
+
+        known = np.vstack([np.asarray(base.item_factors[base_rows]), delta_factors[delta_rows]])
+        user_vector = base.fold_in_factors(known)
+
+        base_scores = base.item_factors @ user_vector
+        base_scores[base_rows] = -np.inf
+        delta_scores = delta_factors @ user_vector
+        # Compaction'dan hemen sonra aynı film iki tarafta da olabilir - ana indeksteki geçerli
+        for i, movie_id in enumerate(delta_ids):
+            if int(movie_id) in liked or int(movie_id) in base.index:
+                delta_scores[i] = -np.inf
+
+        scores = np.concatenate([base_scores, delta_scores])
+        item_ids = np.concatenate([np.asarray(base.item_ids), delta_ids])
+
+        top_n = min(top_n, int(np.isfinite(scores).sum()))
+        if top_n <= 0:
+            return []
+        top = np.argpartition(-scores, top_n - 1)[:top_n]
+        top = top[np.argsort(-scores[top])]
+        return [(int(item_ids[i]), float(scores[i])) for i in top]
+
+    def refresh(self):
+        """Başka bir worker yeni sürüm yazdıysa onu yükle"""
+        version = self._current_version()
+        if version == self.version:
+            return False
+        self.base = ALSModel.load(self.model_dir)
+        self.version = version
+        # Artık ana indekste olan filmleri delta'dan at
+        self.delta.discard([movie_id for movie_id in list(self.delta.counts) if movie_id in self.base.index])
+        print(f"🔄 ALS sürümü yenilendi: {version} ({len(self.base.item_ids):,} film)")
+        return True
+
+    def compact(self):
+        """Delta'yı ana indeksle birleştirip yeni sürüm yaz ve CURRENT'ı atomik olarak değiştir"""
+        with self._compact_lock:
+            lock_path = os.path.join(self.model_dir, LOCK_FILE)
+            if not self._acquire_file_lock(lock_path):
+                return False  # Başka bir worker compaction yapıyor
+            try:
+                self.refresh()
+                delta_ids, delta_factors = self.delta.snapshot()
+                base = self.base
+                fresh = np.array([int(movie_id) not in base.index for movie_id in delta_ids], dtype=bool)
+                if not fresh.any():
+                    return False
+
+                started = time.time()
+                version = os.path.join(VERSIONS_DIR, f"v{int(started * 1000)}")
+                save_model(
+                    os.path.join(self.model_dir, version),
+                    np.vstack([np.asarray(base.item_factors), delta_factors[fresh]]),
+                    np.concatenate([np.asarray(base.item_ids), delta_ids[fresh]]),
+                    dict(base.meta, compacted_from=self.version, delta_items=int(fresh.sum()))
+                )
+                self._write_current(version)
+
+                self.base = ALSModel.load(self.model_dir)
+                self.version = version
+                self.delta.discard(delta_ids)
+                self.compactions += 1
+                self.last_compaction = time.time()
+                print(f"🗜️ ALS compaction: +{int(fresh.sum())} film → {version} ({time.time() - started:.2f}s)")
+
+                self._prune_versions()
+                return True
+            finally:
+                os.remove(lock_path)
+
+    def _acquire_file_lock(self, lock_path):
+        # Süreçler arası kilit - aynı anda iki worker sürüm yazmasın
+        try:
+            if time.time() - os.path.getmtime(lock_path) > self.lock_timeout:
+                os.remove(lock_path)
+        except OSError:
+            pass
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
+    def _write_current(self, version):
+        tmp_path = os.path.join(self.model_dir, CURRENT_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(self.model_dir, CURRENT_FILE))
+
+    def _prune_versions(self):
+        """En yeni keep_versions sürüm dışındakileri sil (açık mmap'ler POSIX'te geçerli kalır)"""
+        versions_dir = os.path.join(self.model_dir, VERSIONS_DIR)
+        versions = sorted(os.listdir(versions_dir), key=lambda name: int(name.lstrip('v') or 0))
+        current = os.path.basename(self.version)
+        for name in versions[:-self.keep_versions]:
+            if name != current:
+                shutil.rmtree(os.path.join(versions_dir, name), ignore_errors=True)
+
+    def start(self):
+        """Compaction'ı arka plan thread'inde çalıştır (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="als-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.compact_interval or None)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                if not self.compact():
+                    self.refresh()
+            except Exception as e:
+                print(f"❌ ALS compaction error: {e}")
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "base_items": len(self.base.item_ids),
+            "delta": self.delta.stats(),
+            "compactions": self.compactions,
+            "last_compaction": self.last_compaction
+        }
@@ -0,0 +1,115 @@
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+
+# TMDB genre ID → özellik vektörü sütunu
+GENRE_COLUMNS = {genre_id: i for i, genre_id in enumerate(
+    [28, 12, 16, 35, 80, 99, 18, 10751, 14, 36, 27, 10402, 9648, 10749, 878, 10770, 53, 10752, 37]
+)}
+PERSON_BUCKETS = 64  # Yönetmen/oyuncu isimleri bu kadar sütuna hash'lenir
+
+
+@lru_cache(maxsize=65536)
+def _bucket(name):
+    # hash() süreçler arası sabit değil, crc32 sabit
+    return len(GENRE_COLUMNS) + zlib.crc32(name.encode('utf-8')) % PERSON_BUCKETS
+
+
+@lru_cache(maxsize=65536)
+def _columns(genre_ids, people):
+    """Bir filmin dolu sütunları - aynı film her istekte yeniden hash'lenmez"""
+    columns = {GENRE_COLUMNS[genre_id] for genre_id in genre_ids if genre_id in GENRE_COLUMNS}
+    columns.update(_bucket(name) for name in people if name)
+    columns = np.fromiter(columns, dtype=np.intp, count=len(columns))
+    columns.flags.writeable = False  # Cache'te paylaşılıyor
+    return columns
+
+
+_columns_by_movie = {}  # movie_id → (genre_ids, directors, actors, sütunlar) - içerik aynıysa tuple/hash kurulmaz
+
+
+def _rec_columns(rec):
+    genre_ids, directors, actors = rec.get('genre_ids'), rec.get('directors'), rec.get('actors')
+    movie_id = rec.get('movie_id')
+    entry = _columns_by_movie.get(movie_id)
+    if entry is not None and entry[0] == genre_ids and entry[1] == directors and entry[2] == actors:
+        return entry[3]
+
+    columns = _columns(tuple(genre_ids or ()), tuple((directors or []) + (actors or [])))
+    if movie_id is not None:
+        if len(_columns_by_movie) >= _columns.cache_info().maxsize:
+            _columns_by_movie.clear()
+        _columns_by_movie[movie_id] = (genre_ids, directors, actors, columns)
+    return columns
+
+
+def build_feature_matrix(recommendations, genre_weight=1.0, person_weight=0.5):
+    """Öneriler için genre one-hot + hash'lenmiş kişi sütunlarından L2-normalize özellik matrisi
+
+    Filmlerin sütun indeksleri toplanır; matris tek np.zeros + fancy-index atama + tek satır normu ile kurulur.
+    """
+    width = len(GENRE_COLUMNS) + PERSON_BUCKETS
+    columns = [_rec_columns(rec) for rec in recommendations]
+    features = np.zeros((len(columns), width), dtype=np.float32)
+    if not columns:
+        return features
+
+    counts = np.fromiter(map(len, columns), dtype=np.intp, count=len(columns))
+    columns = np.concatenate(columns)
+    features[np.repeat(np.arange(len(counts)), counts), columns] = np.where(
+        columns < len(GENRE_COLUMNS), np.float32(genre_weight), np.float32(person_weight))
+    norms = np.sqrt(np.einsum('ij,ij->i', features, features))[:, None]
+    np.divide(features, norms, out=features, where=norms > 0)
+    return features
+
+
+def mmr_rerank(recommendations, top_n=30, diversity=0.3, features=None):
+    """Maximal Marginal Relevance: skor ile önceki seçimlere benzemezlik arasında denge kur
+
+    diversity=0 saf skor sıralaması, 1'e yaklaştıkça çeşitlilik ağırlığı artar.
+    """
+    if not recommendations:
+        return []
+    if diversity <= 0 or len(recommendations) <= 1:
+        return sorted(recommendations, key=lambda r: r.get('score', 0), reverse=True)[:top_n]
+
+    relevance = np.array([rec.get('score', 0) for rec in recommendations], dtype=np.float32)
+    span = relevance.max() - relevance.min()
+    relevance = (relevance - relevance.min()) / span if span > 0 else np.ones_like(relevance)
+
+    top_n = min(top_n, len(recommendations))
+    if top_n <= 0:
+        return []
+    lambda_ = 1.0 - min(1.0, diversity)
+    penalty = np.float32(1.0 - lambda_)
+    weighted_relevance = (lambda_ * relevance).astype(np.float32)
+
+    # Benzerlik en fazla 1 - en alakalı top_n filmden biri her adımda hâlâ seçilebilir ve MMR'ı
+    # en az (top_n'inci alaka - penalty) olur. Alakası bunun altında kalan film hiç seçilemez,
+    # özellik satırı da kurulmaz.
+    floor = np.partition(weighted_relevance, len(weighted_relevance) - top_n)[-top_n] - penalty
+    pool = np.flatnonzero(weighted_relevance >= floor)
+    if features is None:
+        features = build_feature_matrix([recommendations[i] for i in pool])
+    else:
+        features = features[pool]
+    weighted_relevance = weighted_relevance[pool]
+
+    # mmr = alaka - penalty * seçilmişlere en yüksek benzerlik; her adımda tek mat-vec ile güncellenir
+    scaled = np.ascontiguousarray(features.T * penalty)  # (sütun, aday) - f @ scaled satır düzeninde okur
+    mmr = weighted_relevance.copy()
+    candidate_mmr = np.empty_like(mmr)
+    selected = []
+
+    while True:
+        best = int(mmr.argmax())
+        selected.append(pool[best])
+        if len(selected) == top_n:
+            break
+        mmr[best] = -np.inf  # Seçileni bir daha seçme
+        np.subtract(weighted_relevance, features[best] @ scaled, out=candidate_mmr)
+        np.minimum(mmr, candidate_mmr, out=mmr)
+
+    return [recommendations[i] for i in selected]
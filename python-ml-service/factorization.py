@@ -0,0 +1,186 @@
+"""Implicit-feedback matrix factorization (ALS) - MovieLens üzerinde offline eğitim.
+
+Eğitim:
+    python factorization.py --ratings ../data/rating.csv --links ../data/link.csv --out models/als
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+ITEM_FACTORS_FILE = 'item_factors.npy'
+ITEM_IDS_FILE = 'item_ids.npy'
+GRAM_FILE = 'yty.npy'
+META_FILE = 'meta.json'
+CURRENT_FILE = 'CURRENT'  # Artımlı güncellemelerde aktif sürüm dizinini gösterir
+
+
+def resolve_model_dir(model_dir):
+    """CURRENT dosyası varsa aktif sürüm dizinini, yoksa model_dir'in kendisini döndür"""
+    current = os.path.join(model_dir, CURRENT_FILE)
+    if os.path.exists(current):
+        with open(current) as f:
+            return os.path.join(model_dir, f.read().strip())
+    return model_dir
+
+
+def load_interactions(ratings_path, links_path, min_rating=3.5):
+    """MovieLens rating.csv + link.csv → (kullanıcı x film) sparse matris, film ID'leri TMDB ID"""
+    # Sadece offline eğitimde gerekli - servis tarafı pandas/scipy yüklemez
+    import pandas as pd
+    import scipy.sparse as sp
+
+    ratings = pd.read_csv(ratings_path, usecols=['userId', 'movieId', 'rating'])
+    links = pd.read_csv(links_path, usecols=['movieId', 'tmdbId']).dropna()
+
+    # Servis TMDB ID'leriyle çalışıyor - eşleşmeyen filmleri at
+    ratings = ratings[ratings['rating'] >= min_rating].merge(links, on='movieId')
+    print(f"📥 {len(ratings):,} pozitif etkileşim yüklendi")
+
+    user_codes, _ = pd.factorize(ratings['userId'])
+    item_codes, item_ids = pd.factorize(ratings['tmdbId'].astype(np.int64))
+
+    matrix = sp.csr_matrix(
+        (ratings['rating'].to_numpy(np.float32), (user_codes, item_codes)),
+        shape=(user_codes.max() + 1, len(item_ids))
+    )
+    return matrix, np.asarray(item_ids, dtype=np.int64)
+
+
+def _solve_block(rows, matrix, fixed, gram, alpha, regularization):
+    """Bir satır bloğu için (YᵀY + Yᵀ(Cu - I)Y + λI) x_u = Yᵀ Cu p(u) sistemlerini toplu çöz"""
+    factors = fixed.shape[1]
+    lhs = np.empty((len(rows), factors, factors), dtype=np.float64)
+    rhs = np.zeros((len(rows), factors), dtype=np.float64)
+    eye = regularization * np.eye(factors)
+
+    for i, row in enumerate(rows):
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        items = matrix.indices[start:end]
+        confidence = alpha * matrix.data[start:end]  # Cu - I
+        y = fixed[items]
+        lhs[i] = gram + (y.T * confidence) @ y + eye
+        rhs[i] = (confidence + 1.0) @ y
+
+    return np.linalg.solve(lhs, rhs[..., None])[..., 0]
+
+
+def _als_step(matrix, fixed, alpha, regularization, executor, block_size):
+    """Sabit faktörlere göre diğer tarafın tüm faktörlerini blok blok yeniden hesapla"""
+    gram = fixed.T @ fixed
+    solved = np.zeros((matrix.shape[0], fixed.shape[1]), dtype=np.float64)
+    blocks = [np.arange(start, min(start + block_size, matrix.shape[0]))
+              for start in range(0, matrix.shape[0], block_size)]
+
+    # NumPy linalg GIL'i bıraktığı için bloklar thread'lerde paralel çözülür
+    for rows, result in zip(blocks, executor.map(
+            lambda rows: _solve_block(rows, matrix, fixed, gram, alpha, regularization), blocks)):
+        solved[rows] = result
+    return solved
+
+
+def train_als(matrix, factors=64, regularization=0.1, alpha=40.0, iterations=15,
+              workers=None, block_size=2048, seed=42):
+    """Implicit ALS (Hu, Koren & Volinsky) - (kullanıcı, film) faktörlerini döndür"""
+    rng = np.random.default_rng(seed)
+    n_users, n_items = matrix.shape
+    user_factors = rng.normal(scale=0.01, size=(n_users, factors))
+    item_factors = rng.normal(scale=0.01, size=(n_items, factors))
+
+    matrix = matrix.tocsr()
+    matrix_t = matrix.T.tocsr()
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for iteration in range(iterations):
+            started = time.time()
+            user_factors = _als_step(matrix, item_factors, alpha, regularization, executor, block_size)
+            item_factors = _als_step(matrix_t, user_factors, alpha, regularization, executor, block_size)
+            print(f"   🔁 İterasyon {iteration + 1}/{iterations} - {time.time() - started:.1f}s")
+
+    return user_factors.astype(np.float32), item_factors.astype(np.float32)
+
+
+def save_model(out_dir, item_factors, item_ids, params):
+    """Film faktörlerini mmap ile açılabilecek .npy artifact'ları olarak kaydet"""
+    os.makedirs(out_dir, exist_ok=True)
+    item_factors = np.ascontiguousarray(item_factors, dtype=np.float32)
+    np.save(os.path.join(out_dir, ITEM_FACTORS_FILE), item_factors)
+    np.save(os.path.join(out_dir, ITEM_IDS_FILE), np.asarray(item_ids, dtype=np.int64))
+    np.save(os.path.join(out_dir, GRAM_FILE), (item_factors.T @ item_factors).astype(np.float32))
+    with open(os.path.join(out_dir, META_FILE), 'w') as f:
+        json.dump(dict(params, n_items=int(item_factors.shape[0]), created_at=time.time()), f, indent=2)
+    print(f"💾 ALS modeli kaydedildi: {out_dir} ({item_factors.shape[0]:,} film)")
+
+
+class ALSModel:
+    """Servis tarafı: memory-mapped film faktörleri + fold-in ile kullanıcı vektörü"""
+
+    def __init__(self, item_factors, item_ids, gram, regularization=0.1, alpha=40.0, meta=None):
+        self.item_factors = item_factors
+        self.item_ids = item_ids
+        self.gram = np.asarray(gram, dtype=np.float64)
+        self.regularization = regularization
+        self.alpha = alpha
+        self.meta = meta or {}
+        self.index = {int(item_id): i for i, item_id in enumerate(item_ids)}
+
+    @classmethod
+    def load(cls, model_dir):
+        model_dir = resolve_model_dir(model_dir)
+        with open(os.path.join(model_dir, META_FILE)) as f:
+            meta = json.load(f)
+        return cls(
+            np.load(os.path.join(model_dir, ITEM_FACTORS_FILE), mmap_mode='r'),
+            np.load(os.path.join(model_dir, ITEM_IDS_FILE), mmap_mode='r'),
+            np.load(os.path.join(model_dir, GRAM_FILE)),
+            regularization=meta.get('regularization', 0.1),
+            alpha=meta.get('alpha', 40.0),
+            meta=meta
+        )
+
+    def fold_in_factors(self, y, weights=None):
+        """Verilen film faktörlerinden kullanıcı vektörünü tek bir küçük lineer sistemle çıkar"""
+        y = np.asarray(y, dtype=np.float64)
+        weights = np.ones(len(y)) if weights is None else np.asarray(weights, dtype=np.float64)[:len(y)]
+        confidence = self.alpha * weights
+
+        lhs = self.gram + (y.T * confidence) @ y + self.regularization * np.eye(y.shape[1])
+        rhs = (confidence + 1.0) @ y
+        return np.linalg.solve(lhs, rhs).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MovieLens üzerinde implicit ALS modeli eğit")
+    parser.add_argument('--ratings', default='../data/rating.csv')
+    parser.add_argument('--links', default='../data/link.csv')
+    parser.add_argument('--out', default='models/als')
+    parser.add_argument('--factors', type=int, default=64)
+    parser.add_argument('--iterations', type=int, default=15)
+    parser.add_argument('--regularization', type=float, default=0.1)
+    parser.add_argument('--alpha', type=float, default=40.0)
+    parser.add_argument('--min-rating', type=float, default=3.5)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    matrix, item_ids = load_interactions(args.ratings, args.links, args.min_rating)
+    # Rating'i 0-1 aralığına çek - güven = 1 + alpha * r
+    matrix.data /= 5.0
+
+    print(f"🧮 ALS eğitiliyor: {matrix.shape[0]:,} kullanıcı x {matrix.shape[1]:,} film, {args.factors} faktör")
+    _, item_factors = train_als(matrix, args.factors, args.regularization, args.alpha,
+                                args.iterations, args.workers)
+    save_model(args.out, item_factors, item_ids, {
+        "factors": args.factors,
+        "regularization": args.regularization,
+        "alpha": args.alpha,
+        "iterations": args.iterations,
+        "min_rating": args.min_rating
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import threading
+from collections import OrderedDict
+
+
+class PersonIndex:
+    """TMDB credits'ten kurulan ters indeks: kişi → kayıt, kişi → filmler, film → kişiler
+
+    Filmler ve kişiler LRU ile sınırlıdır; bir film atılınca kişi postings'lerinden de çıkar.
+    """
+
+    def __init__(self, max_actors=5, max_movies=5000, max_people=None):
+        self.max_actors = max_actors
+        self.max_movies = max_movies
+        # Film başına en fazla (yönetmenler + max_actors) kişi - kabaca aynı oranda sınırla
+        self.max_people = max_people or max_movies * (max_actors + 2)
+        self.people = OrderedDict()        # person_id → {"id", "name", "roles"}
+        self.person_movies = {}            # person_id → {movie_id, ...}
+        self.movie_people = OrderedDict()  # movie_id → {"directors": [...], "cast": [...]}
+        self.movies = {}                   # movie_id → discover formatında kısa film kaydı
+        self.evicted = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.people)
+
+    def add_person(self, person_id, name, role=None):
+        """Tek bir kişiyi (ör. kullanıcının beğendiği filmden) indekse ekle"""
+        if person_id is None or not name:
+            return
+        with self._lock:
+            self._add_person(person_id, name, role)
+            self._evict()
+
+    def _add_person(self, person_id, name, role):
+        record = self.people.get(person_id)
+        if record is None:
+            record = self.people[person_id] = {"id": person_id, "name": name, "roles": set()}
+        else:
+            self.people.move_to_end(person_id)
+        if role:
+            record["roles"].add(role)
+
+    def add_movie(self, movie_id, details):
+        """TMDB detay cevabındaki credits'i indekse ekle"""
+        credits = details.get('credits') or {}
+        directors = [p for p in credits.get('crew', []) if p.get('job') == 'Director' and p.get('id') is not None]
+        cast = [p for p in credits.get('cast', [])[:self.max_actors] if p.get('id') is not None]
+
+        with self._lock:
+            if movie_id in self.movie_people:
+                self._remove_movie(movie_id)
+            self.movie_people[movie_id] = {
+                "directors": [p['id'] for p in directors],
+                "cast": [p['id'] for p in cast]
+            }
+            self.movies[movie_id] = {
+                "id": movie_id,
+                "title": details.get('title'),
+                "genre_ids": [g['id'] for g in details.get('genres', []) if 'id' in g],
+                "popularity": details.get('popularity', 0),
+                "vote_average": details.get('vote_average'),
+                "poster_path": details.get('poster_path'),
+                "release_date": details.get('release_date'),
+                "overview": details.get('overview')
+            }
+            for role, people in (("director", directors), ("actor", cast)):
+                for person in people:
+                    self._add_person(person['id'], person.get('name'), role)
+                    self.person_movies.setdefault(person['id'], set()).add(movie_id)
+            self._evict()
+
+    def _remove_movie(self, movie_id):
+        """Filmi ve kişi postings'lerindeki izlerini sil (kişi kayıtları LRU'da kalır)"""
+        entry = self.movie_people.pop(movie_id)
+        self.movies.pop(movie_id, None)
+        for person_id in entry["directors"] + entry["cast"]:
+            movies = self.person_movies.get(person_id)
+            if movies is not None:
+                movies.discard(movie_id)
+                if not movies:
+                    del self.person_movies[person_id]
+
+    def _evict(self):
+        # details cache ile aynı ölçekte kal - en uzun süredir dokunulmayanlar gider
+        while len(self.movie_people) > self.max_movies:
+            self._remove_movie(next(iter(self.movie_people)))
+            self.evicted += 1
+        while len(self.people) > self.max_people:
+            person_id, _ = self.people.popitem(last=False)
+            self.person_movies.pop(person_id, None)
+
+    def has_movie(self, movie_id):
+        return movie_id in self.movie_people
+
+    def people_for(self, movie_id):
+        """Filmin (yönetmen ID'leri, oyuncu ID'leri) - indekste yoksa None"""
+        with self._lock:
+            entry = self.movie_people.get(movie_id)
+            if entry is None:
+                return None
+            self.movie_people.move_to_end(movie_id)
+            return list(entry["directors"]), list(entry["cast"])
+
+    def name(self, person_id, default='Unknown'):
+        record = self.people.get(person_id)
+        return record["name"] if record else default
+
+    def movies_for(self, person_ids, exclude=()):
+        """Verilen kişilerin yer aldığı film ID'leri (set birleşimi)"""
+        with self._lock:
+            movie_ids = set()
+            for person_id in person_ids:
+                movie_ids |= self.person_movies.get(person_id, set())
+        return movie_ids - set(exclude)
+
+    def movie_records(self, movie_ids):
+        """İndekslenmiş filmlerin discover formatında kopyaları"""
+        with self._lock:
+            records = []
+            for movie_id in movie_ids:
+                if movie_id in self.movies:
+                    self.movie_people.move_to_end(movie_id)  # Kullanılan filmler LRU'da kalır
+                    records.append(dict(self.movies[movie_id]))
+            return records
+
+    def stats(self):
+        with self._lock:
+            return {
+                "people": len(self.people),
+                "movies": len(self.movie_people),
+                "max_movies": self.max_movies,
+                "evicted": self.evicted
+            }
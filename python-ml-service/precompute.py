@@ -0,0 +1,148 @@
+"""Aktif kullanıcılar için önerileri toplu (offline) önceden hesapla.
+
+Girdi her satırı bir kullanıcı olan JSONL dosyası (/ml/recommend gövdesiyle aynı alanlar):
+    {"user_id": "...", "liked_movies": [{"movieId": 550, "title": "...", "genres": [...]}, ...]}
+
+Kullanım:
+    python precompute.py users.jsonl --workers 8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from store import DEFAULT_STORE_PATH, RecommendationStore, likes_fingerprint
+
+
+_app = None
+
+# TMDB'ye ulaşılamadığında üretilen yer tutucu öneriler - depoya yazılmaz
+FALLBACK_SOURCES = {'python_ml_fallback'}
+
+
+class IncompleteResultError(Exception):
+    """Sonuç TMDB hatası nedeniyle eksik/yer tutucu - kaydedilmez, sonraki çalıştırmada tekrar denenir"""
+
+
+def _init_worker(workers, total_rate, verbose):
+    """Her işçi süreç app'i kendisi yükler; ALS artifact'ları mmap ile süreçler arası paylaşılır"""
+    global _app
+    os.environ['ML_WARMUP_ENABLED'] = 'false'
+    # TMDB hız sınırı tüm süreçler arasında bölünür
+    os.environ['TMDB_RATE_LIMIT'] = str(max(1.0, total_rate / workers))
+    if not verbose:
+        sys.stdout = open(os.devnull, 'w')
+
+    import app
+    _app = app
+
+
+def _compute(user, algorithm):
+    liked_movies = user.get('liked_movies', [])
+    recommendations = []
+    used = algorithm
+
+    if algorithm == 'als':
+        recommendations = _app.get_als_recommendations(liked_movies)
+    if not recommendations:
+        used = 'hybrid_content_based'
+        recommendations = _app.generate_ml_recommendations(liked_movies)
+
+    # Servis bu sonucu ML_PRECOMPUTED_MAX_AGE boyunca sunar - degrade sonucu kalıcılaştırma
+    if not recommendations:
+        raise IncompleteResultError("öneri üretilemedi")
+    if any(rec.get('source') in FALLBACK_SOURCES for rec in recommendations):
+        raise IncompleteResultError("TMDB'ye ulaşılamadı, yer tutucu öneriler döndü")
+    if _app.tmdb.degraded:
+        raise IncompleteResultError("TMDB circuit breaker açık, sonuçlar cache/offline adaylardan")
+
+    return str(user['user_id']), likes_fingerprint(liked_movies), used, recommendations
+
+
+def read_users(path):
+    with open(path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                user = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️ Satır {line_no} okunamadı: {e}")
+                continue
+            if user.get('user_id') is not None and user.get('liked_movies'):
+                yield user
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kullanıcı önerilerini offline önceden hesapla")
+    parser.add_argument('users', help="Kullanıcı/beğeni JSONL export'u")
+    parser.add_argument('--out', default=DEFAULT_STORE_PATH, help="SQLite sonuç deposu")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--algorithm', default='hybrid_content_based', choices=['hybrid_content_based', 'als'])
+    parser.add_argument('--tmdb-rate', type=float, default=float(os.getenv('TMDB_RATE_LIMIT', 40)),
+                        help="Tüm işçiler için toplam TMDB istek/saniye")
+    parser.add_argument('--batch-size', type=int, default=100, help="Depoya kaç sonuçta bir yazılsın")
+    parser.add_argument('--force', action='store_true', help="Güncel sonucu olan kullanıcıları da yeniden hesapla")
+    parser.add_argument('--verbose', action='store_true', help="İşçi süreç loglarını göster")
+    args = parser.parse_args()
+
+    store = RecommendationStore(args.out)
+    done = {} if args.force else store.fingerprints()
+
+    # Kaldığı yerden devam: beğenileri değişmemiş kullanıcıları atla
+    pending = (user for user in read_users(args.users)
+               if done.get(str(user['user_id'])) != likes_fingerprint(user['liked_movies']))
+
+    print(f"🚀 Precompute başladı: {args.workers} işçi, depo: {args.out} ({len(done)} mevcut kayıt)")
+    started = last_report = time.time()
+    processed = failed = 0
+    batch = []
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(args.workers, args.tmdb_rate, args.verbose)) as executor:
+        in_flight = set()
+        exhausted = False
+
+        while in_flight or not exhausted:
+            # Bellek şişmesin diye aynı anda sınırlı sayıda iş kuyrukta
+            while not exhausted and len(in_flight) < args.workers * 4:
+                user = next(pending, None)
+                if user is None:
+                    exhausted = True
+                    break
+                in_flight.add(executor.submit(_compute, user, args.algorithm))
+
+            if not in_flight:
+                break
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+
+            for future in finished:
+                try:
+                    batch.append(future.result())
+                    processed += 1
+                except Exception as e:
+                    failed += 1
+                    print(f"❌ Kullanıcı hesaplanamadı: {e}")
+
+            if len(batch) >= args.batch_size:
+                store.put_many(batch)
+                batch = []
+
+            now = time.time()
+            if now - last_report >= 10:
+                print(f"   📈 {processed} kullanıcı, {processed / (now - started):.2f} kullanıcı/sn, {failed} hata")
+                last_report = now
+
+    if batch:
+        store.put_many(batch)
+
+    elapsed = max(time.time() - started, 1e-9)
+    print(f"✅ Precompute tamamlandı: {processed} kullanıcı {elapsed:.1f}s içinde "
+          f"({processed / elapsed:.2f} kullanıcı/sn), {failed} hata, depoda {len(store)} kayıt")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+
+DEFAULT_STORE_PATH = os.getenv(
+    'ML_PRECOMPUTED_DB',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'precomputed.sqlite3')
+)
+
+
+def likes_fingerprint(liked_movies):
+    """Beğeni listesinin sıradan bağımsız özeti - beğeniler değişince önceden hesaplanan sonuç geçersiz"""
+    movie_ids = sorted(str(movie.get('movieId')) for movie in liked_movies)
+    return hashlib.sha1(','.join(movie_ids).encode('utf-8')).hexdigest()
+
+
+class RecommendationStore:
+    """Önceden hesaplanmış önerileri tutan SQLite key-value deposu (zlib sıkıştırılmış JSON)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS recommendations (
+                user_id TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                algorithm TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+
+    @classmethod
+    def open_existing(cls, path):
+        """Dosya varsa aç, yoksa None (servis tarafı depo oluşturmaz)"""
+        return cls(path) if os.path.exists(path) else None
+
+    def _connect(self):
+        # sqlite3 bağlantıları thread'ler arasında paylaşılamaz
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')  # Job yazarken servis okuyabilsin
+            self._local.conn = conn
+        return conn
+
+    def get(self, user_id, fingerprint=None, max_age=None):
+        row = self._connect().execute(
+            'SELECT fingerprint, algorithm, payload, created_at FROM recommendations WHERE user_id = ?',
+            (str(user_id),)
+        ).fetchone()
+        if row is None:
+            return None
+
+        stored_fingerprint, algorithm, payload, created_at = row
+        if fingerprint is not None and stored_fingerprint != fingerprint:
+            return None
+        if max_age is not None and time.time() - created_at > max_age:
+            return None
+
+        return {
+            "algorithm": algorithm,
+            "recommendations": json.loads(zlib.decompress(payload)),
+            "created_at": created_at
+        }
+
+    def fingerprints(self):
+        """user_id → fingerprint (job'un kaldığı yerden devam etmesi için)"""
+        return dict(self._connect().execute('SELECT user_id, fingerprint FROM recommendations'))
+
+    def put_many(self, rows):
+        """(user_id, fingerprint, algorithm, recommendations) kayıtlarını tek transaction'da yaz"""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO recommendations VALUES (?, ?, ?, ?, ?)',
+                [(str(user_id), fingerprint, algorithm,
+                  zlib.compress(json.dumps(recs, separators=(',', ':')).encode('utf-8')), now)
+                 for user_id, fingerprint, algorithm, recs in rows]
+            )
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM recommendations').fetchone()[0]
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Servis modülleri paket değil - testler python-ml-service/ dizininden import eder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,72 @@
+import threading
+import time
+
+
+class FakeRedis:
+    """RedisCache'in kullandığı komut alt kümesini (get/set/delete/mget ve sorted set komutları) sağlayan yerel stand-in"""
+
+    def __init__(self):
+        self._data = {}   # key → (expires_at | None, value)
+        self._zsets = {}  # key → {member: score}
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is not None and entry[0] is not None and entry[0] <= time.time():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key)
+            return None if entry is None else entry[1]
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (None if ex is None else time.time() + ex, value)
+        return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(1 for key in keys
+                       if self._data.pop(key, None) is not None or self._zsets.pop(key, None) is not None)
+
+    def mget(self, keys):
+        return [self.get(key) for key in keys]
+
+    def zadd(self, name, mapping):
+        with self._lock:
+            zset = self._zsets.setdefault(name, {})
+            added = sum(1 for member in mapping if member not in zset)
+            zset.update(mapping)
+            return added
+
+    def zcard(self, name):
+        with self._lock:
+            return len(self._zsets.get(name, {}))
+
+    def zcount(self, name, low, high):
+        low, high = float(low), float(high)
+        with self._lock:
+            return sum(1 for score in self._zsets.get(name, {}).values() if low <= score <= high)
+
+    def zrange(self, name, start, end):
+        with self._lock:
+            members = sorted(self._zsets.get(name, {}).items(), key=lambda item: (item[1], item[0]))
+        members = [member for member, _ in members]
+        return members[start:] if end == -1 else members[start:end + 1]
+
+    def zrem(self, name, *members):
+        with self._lock:
+            zset = self._zsets.get(name, {})
+            return sum(1 for member in members if zset.pop(member, None) is not None)
+
+    def zremrangebyscore(self, name, low, high):
+        low, high = float(low), float(high)
+        with self._lock:
+            zset = self._zsets.get(name, {})
+            doomed = [member for member, score in zset.items() if low <= score <= high]
+            for member in doomed:
+                del zset[member]
+            return len(doomed)
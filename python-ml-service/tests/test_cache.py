@@ -0,0 +1,76 @@
+import pytest
+
+from cache import MemoryCache, RedisCache, SQLiteCache
+from fake_redis import FakeRedis
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def make_cache(request, tmp_path):
+    def factory(name='test', max_size=100, ttl=60):
+        if request.param == 'sqlite':
+            return SQLiteCache(name, str(tmp_path / 'cache.sqlite3'), max_size=max_size, ttl=ttl)
+        if request.param == 'redis':
+            if not hasattr(request, '_redis'):
+                request._redis = FakeRedis()  # Aynı testteki örnekler aynı sunucuyu paylaşır
+            return RedisCache(name, request._redis, max_size=max_size, ttl=ttl)
+        return MemoryCache(name, max_size=max_size, ttl=ttl)
+    return factory
+
+
+def test_get_set_roundtrip(make_cache):
+    cache = make_cache()
+    assert cache.get(('drama', 1)) is None
+    cache.set(('drama', 1), [{"id": 550}])
+    assert cache.get(('drama', 1)) == [{"id": 550}]
+    assert ('drama', 1) in cache
+    assert len(cache) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_expired_entry_is_a_miss_but_readable_stale(make_cache):
+    cache = make_cache()
+    cache.set(550, {"title": "Fight Club"}, ttl=-1)
+    assert cache.get(550) is None
+    assert 550 not in cache
+    assert cache.get_stale(550) == {"title": "Fight Club"}
+    assert cache.get_stale(551, 'default') == 'default'
+
+
+def test_values_include_stale_entries(make_cache):
+    cache = make_cache()
+    cache.set(1, 'fresh')
+    cache.set(2, 'stale', ttl=-1)
+    assert sorted(cache.values()) == ['fresh', 'stale']
+
+
+def test_clear_only_touches_own_namespace(make_cache):
+    candidates = make_cache('candidates')
+    details = make_cache('details')
+    candidates.set(1, 'a')
+    details.set(1, 'b')
+    candidates.clear()
+    assert len(candidates) == 0 and candidates.values() == []
+    assert details.get(1) == 'b'
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'redis'])
+def test_size_limit_is_shared_across_writers(backend, tmp_path):
+    if backend == 'sqlite':
+        path = str(tmp_path / 'shared.sqlite3')
+        writers = [SQLiteCache('shared', path, max_size=50) for _ in range(4)]
+    else:
+        server = FakeRedis()
+        writers = [RedisCache('shared', server, max_size=50) for _ in range(4)]
+    for i in range(100):
+        for n, cache in enumerate(writers):
+            cache.set((n, i), i)
+    assert len(writers[0]) <= writers[0]._prune_above
+    # En son yazılanlar tutulur
+    assert writers[0].get((3, 99)) == 99
+
+
+def test_redis_size_ignores_entries_past_stale_window():
+    cache = RedisCache('test', FakeRedis(), stale_ttl=60)
+    cache.set(1, 'stale', ttl=-1)
+    cache.set(2, 'gone', ttl=-120)  # Redis TTL'i çoktan dolmuş olurdu
+    assert len(cache) == 1
@@ -0,0 +1,152 @@
+import os
+
+import numpy as np
+import pytest
+
+from delta_index import LOCK_FILE, VERSIONS_DIR, DeltaSegment, IncrementalALSIndex
+from factorization import CURRENT_FILE, ALSModel, save_model
+
+
+FACTORS = 4
+BASE_IDS = list(range(1, 11))
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    """10 filmlik küçük ALS modeli - CURRENT yok, model_dir'in kendisi ana sürüm"""
+    rng = np.random.default_rng(0)
+    save_model(str(tmp_path), rng.normal(size=(len(BASE_IDS), FACTORS)), BASE_IDS, {"regularization": 0.1})
+    return str(tmp_path)
+
+
+def make_index(model_dir, **kwargs):
+    kwargs.setdefault('compact_threshold', 0)
+    return IncrementalALSIndex(model_dir, **kwargs)
+
+
+def versions(model_dir):
+    return sorted(os.listdir(os.path.join(model_dir, VERSIONS_DIR)))
+
+
+def test_delta_support_counts_distinct_users():
+    segment = DeltaSegment(2, min_support=2)
+    segment.add('u1', [900], np.array([1.0, 0.0]))
+    segment.add('u1', [900], np.array([1.0, 0.0]))
+    assert len(segment) == 0  # Aynı kullanıcı tek destek sayılır
+    assert segment.snapshot()[0].tolist() == []
+
+    segment.add('u2', [900], np.array([0.0, 1.0]))
+    ids, factors = segment.snapshot()
+    assert ids.tolist() == [900]
+    assert np.allclose(factors, [[0.5, 0.5]])
+    assert segment.stats() == {"tracked": 1, "active": 1, "interactions": 3}
+
+
+def test_delta_stops_averaging_after_max_supporters():
+    segment = DeltaSegment(1, min_support=1, max_supporters=2)
+    for user_id, value in (('u1', 1.0), ('u2', 3.0), ('u3', 100.0)):
+        segment.add(user_id, [900], np.array([value]))
+    assert segment.counts[900] == 2
+    assert np.allclose(segment.snapshot()[1], [[2.0]])
+
+
+def test_delta_discard_drops_movies():
+    segment = DeltaSegment(1, min_support=1)
+    segment.add('u1', [900, 901], np.array([1.0]))
+    segment.discard(np.array([900]))
+    assert segment.snapshot()[0].tolist() == [901]
+
+
+def test_record_skips_unchanged_like_set(model_dir):
+    index = make_index(model_dir)
+    index.record('u1', [1, 2, 900])
+    index.record('u1', [2, 1, 900])  # Sayfa yenileme - aynı küme
+    assert index.delta.interactions == 1
+    index.record('u1', [1, 2, 900, 901])
+    assert index.delta.interactions == 2
+    index.record(None, [1, 900])
+    assert index.delta.interactions == 2
+
+
+def test_delta_movie_is_recommended_once_supported(model_dir):
+    index = make_index(model_dir)
+    index.record('u1', [1, 2, 900])
+    assert 900 not in [movie_id for movie_id, _ in index.recommend([1, 2], top_n=20)]
+    index.record('u2', [1, 3, 900])
+    assert 900 in [movie_id for movie_id, _ in index.recommend([1, 2], top_n=20)]
+
+
+def test_compact_writes_version_and_switches_current(model_dir):
+    index = make_index(model_dir)
+    index.record('u1', [1, 2, 900])
+    index.record('u2', [1, 3, 900])
+
+    assert index.compact()
+    with open(os.path.join(model_dir, CURRENT_FILE)) as f:
+        current = f.read().strip()
+    assert current == index.version and current.startswith(VERSIONS_DIR + os.sep)
+    assert not os.path.exists(os.path.join(model_dir, CURRENT_FILE + '.tmp'))
+    assert not os.path.exists(os.path.join(model_dir, LOCK_FILE))
+
+    assert 900 in index.base.index and len(index.delta) == 0
+    assert ALSModel.load(model_dir).index.keys() == set(BASE_IDS) | {900}
+    assert index.compactions == 1
+    assert not index.compact()  # Taşınacak delta kalmadı
+
+
+def test_compact_skips_while_another_worker_holds_lock(model_dir):
+    index = make_index(model_dir)
+    index.record('u1', [1, 900])
+    index.record('u2', [2, 900])
+    open(os.path.join(model_dir, LOCK_FILE), 'w').close()
+    assert not index.compact()
+    assert not os.path.exists(os.path.join(model_dir, CURRENT_FILE))
+
+    index.lock_timeout = -1  # Kilit terk edilmiş sayılır
+    assert index.compact()
+
+
+def test_refresh_picks_up_other_workers_version(model_dir):
+    writer = make_index(model_dir)
+    reader = make_index(model_dir)
+    assert not reader.refresh()
+
+    for index in (writer, reader):
+        index.record('u1', [1, 900])
+        index.record('u2', [2, 900])
+    assert writer.compact()
+
+    assert reader.refresh()
+    assert reader.version == writer.version
+    assert 900 in reader.base.index
+    assert 900 not in reader.delta.counts  # Artık ana indekste
+
+
+def test_prune_keeps_newest_versions_and_current(model_dir):
+    index = make_index(model_dir, keep_versions=3)
+    for stamp in (1, 2, 3, 4, 5, 10):
+        os.makedirs(os.path.join(model_dir, VERSIONS_DIR, f"v{stamp}"))
+
+    index.version = os.path.join(VERSIONS_DIR, 'v2')
+    index._prune_versions()
+    assert versions(model_dir) == ['v10', 'v2', 'v4', 'v5']  # Sayısal sıralanır; aktif sürüm silinmez
+
+    index.version = os.path.join(VERSIONS_DIR, 'v10')
+    index._prune_versions()
+    assert versions(model_dir) == ['v10', 'v4', 'v5']
+
+
+def test_repeated_compactions_keep_three_versions(model_dir, monkeypatch):
+    import delta_index
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr(delta_index.time, 'time', lambda: next(clock))
+
+    index = make_index(model_dir, keep_versions=3)
+    for movie_id in range(900, 905):
+        index.record('u1', [1, movie_id])
+        index.record('u2', [2, movie_id])
+        assert index.compact()
+
+    assert len(versions(model_dir)) == 3
+    assert os.path.basename(index.version) in versions(model_dir)
+    assert ALSModel.load(model_dir).index.keys() == set(BASE_IDS) | set(range(900, 905))
@@ -0,0 +1,183 @@
+import pytest
+import requests
+
+import tmdb_client
+from tmdb_client import (CircuitBreaker, CircuitOpenError, DeadlineExceededError, TMDBClient, TMDBError,
+                         TokenBucket)
+
+
+class StubResponse:
+    def __init__(self, status_code=200, payload=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._payload = payload if payload is not None else {}
+
+    def json(self):
+        return self._payload
+
+
+class StubSession:
+    """Sıradaki cevabı (ya da exception'ı) döndüren session - gerçek ağa çıkılmaz"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.timeouts = []
+
+    def get(self, url, params=None, timeout=None):
+        self.timeouts.append(timeout)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class FixedDeadline:
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def remaining(self):
+        return self.seconds
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    calls = []
+    monkeypatch.setattr(tmdb_client.time, 'sleep', calls.append)
+    return calls
+
+
+def make_client(*outcomes, **kwargs):
+    kwargs.setdefault('rate', 1000)
+    client = TMDBClient('key', 'https://tmdb.test/3', **kwargs)
+    client.session = StubSession(*outcomes)
+    return client
+
+
+def open_breaker(client):
+    for _ in range(client.breaker.failure_threshold):
+        client.breaker.record_failure()
+
+
+def test_token_bucket_allows_burst_then_times_out():
+    bucket = TokenBucket(rate=1, capacity=2)
+    assert bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0)
+
+
+def test_half_open_allows_a_single_trial():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    assert breaker.allow()
+    assert not breaker.allow()  # Deneme sürerken ikinci istek geçmez
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_trial_reopens_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.reset_timeout = 60
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_open_breaker_short_circuits():
+    client = make_client(failure_threshold=1, reset_timeout=60)
+    open_breaker(client)
+    with pytest.raises(CircuitOpenError):
+        client.get('movie/550')
+    assert client.session.timeouts == []
+    assert client.stats()["short_circuited"] == 1
+
+
+def test_retry_after_header_is_honoured(sleeps):
+    client = make_client(StubResponse(429, headers={'Retry-After': '2'}), StubResponse(200, {"id": 550}))
+    assert client.get('movie/550') == {"id": 550}
+    assert sleeps == [2.0]
+    stats = client.stats()
+    assert stats["throttled"] == 1 and stats["retries"] == 1 and stats["requests"] == 2
+
+
+def test_retry_after_is_capped_by_backoff_max(sleeps):
+    client = make_client(StubResponse(429, headers={'Retry-After': '120'}), StubResponse(200), backoff_max=8.0)
+    client.get('movie/550')
+    assert sleeps == [8.0]
+
+
+def test_retries_exhausted_count_as_breaker_failure(sleeps):
+    client = make_client(*[StubResponse(503)] * 3, max_retries=2, failure_threshold=1, reset_timeout=60)
+    with pytest.raises(TMDBError) as excinfo:
+        client.get('movie/550')
+    assert excinfo.value.status_code == 503
+    assert len(sleeps) == 2
+    assert client.stats()["failures"] == 1
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+
+def test_not_found_counts_as_breaker_success():
+    client = make_client(StubResponse(404), failure_threshold=1, reset_timeout=0)
+    open_breaker(client)
+    with pytest.raises(TMDBError) as excinfo:
+        client.get('movie/0')  # Half-open denemesi
+    assert excinfo.value.status_code == 404
+    assert not isinstance(excinfo.value, DeadlineExceededError)
+    assert client.breaker.state == CircuitBreaker.CLOSED
+    assert client.stats()["failures"] == 0
+
+
+def test_budget_shortened_timeout_does_not_trip_breaker(sleeps):
+    client = make_client(requests.Timeout(), failure_threshold=1, timeout=10)
+    client._backoff = lambda attempt, response=None: 1.0
+    with pytest.raises(DeadlineExceededError):
+        client.get('movie/550', deadline=FixedDeadline(0.5))
+    assert client.session.timeouts == [0.5]
+    assert client.breaker.state == CircuitBreaker.CLOSED
+    stats = client.stats()
+    assert stats["deadline_exceeded"] == 1 and stats["failures"] == 0
+    assert sleeps == []
+
+
+def test_full_timeout_counts_as_failure(sleeps):
+    client = make_client(requests.Timeout(), requests.Timeout(), max_retries=1, failure_threshold=1,
+                         reset_timeout=60, timeout=10)
+    with pytest.raises(TMDBError):
+        client.get('movie/550')
+    assert client.session.timeouts == [10, 10]
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+
+def test_deadline_give_up_releases_half_open_trial(sleeps):
+    client = make_client(requests.Timeout(), failure_threshold=1, reset_timeout=0, timeout=10)
+    client._backoff = lambda attempt, response=None: 1.0
+    open_breaker(client)
+    with pytest.raises(DeadlineExceededError):
+        client.get('movie/550', deadline=FixedDeadline(0.5))
+    # Deneme sonuçsuz bitti - breaker yeniden açılmaz, sıradaki istek denemeyi üstlenebilir
+    assert client.breaker.state == CircuitBreaker.HALF_OPEN
+    assert client.breaker.allow()
+
+
+def test_deadline_give_up_after_tmdb_error_counts_failure(sleeps):
+    client = make_client(StubResponse(503), failure_threshold=1, reset_timeout=60)
+    client._backoff = lambda attempt, response=None: 1.0
+    with pytest.raises(DeadlineExceededError) as excinfo:
+        client.get('movie/550', deadline=FixedDeadline(0.5))
+    assert excinfo.value.status_code == 503
+    assert client.stats()["failures"] == 1
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+
+def test_expired_deadline_skips_request():
+    client = make_client()
+    with pytest.raises(DeadlineExceededError):
+        client.get('movie/550', deadline=FixedDeadline(0))
+    assert client.session.timeouts == []
+    assert client.stats()["deadline_exceeded"] == 1
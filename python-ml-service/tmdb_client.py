@@ -0,0 +1,244 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TMDBError(Exception):
+    """TMDB isteği başarısız oldu"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitOpenError(TMDBError):
+    """Circuit breaker açık - TMDB şu an degrade, istek gönderilmedi"""
+
+
+class DeadlineExceededError(TMDBError):
+    """Çağıranın zaman bütçesi bitti - istek (veya tekrar denemesi) yapılmadı"""
+
+
+class TokenBucket:
+    """Thread'ler arasında paylaşılan token-bucket hız sınırlayıcı"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self, timeout=None):
+        """Bir token al; gerekirse bekle. Zaman aşımında False döner"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait_for = (1 - self._tokens) / self.rate
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait_for = min(wait_for, remaining)
+            time.sleep(wait_for)
+
+
+class CircuitBreaker:
+    """Ardışık hatalarda devreyi açan, cooldown sonrası tek deneme yapan breaker"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            # Half-open: aynı anda tek deneme isteği
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        """Sonuç kaydetmeden çıkan half-open denemesinin yerini boşalt"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    print(f"🔌 TMDB circuit breaker AÇILDI ({self._failures} ardışık hata)")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class TMDBClient:
+    """Paylaşılan TMDB istemcisi: connection pool, rate limit, retry ve circuit breaker"""
+
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+    def __init__(self, api_key, base_url, rate=40.0, burst=None, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0, timeout=10, pool_size=20,
+                 failure_threshold=5, reset_timeout=30.0):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "throttled": 0, "failures": 0, "short_circuited": 0,
+                       "deadline_exceeded": 0}
+
+    def _count(self, key):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def _backoff(self, attempt, response=None):
+        """Jitter'lı exponential backoff; 429'da Retry-After başlığına uy"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    return min(self.backoff_max, float(retry_after))
+                except ValueError:
+                    pass
+        cap = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    @property
+    def degraded(self):
+        return self.breaker.state != CircuitBreaker.CLOSED
+
+    def get(self, path, params=None, deadline=None):
+        """TMDB'ye GET isteği at ve JSON döndür; başarısızlıkta TMDBError fırlat
+
+        deadline (remaining() metodu olan nesne) verilirse token bekleme, istek timeout'u ve
+        retry uykuları kalan süreyle sınırlanır; süre bitince DeadlineExceededError fırlar.
+        """
+        if deadline is not None and deadline.remaining() <= 0:
+            self._count("deadline_exceeded")
+            raise DeadlineExceededError("Request deadline exceeded before TMDB call")
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise CircuitOpenError("TMDB circuit breaker open")
+
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        query = dict(params or {})
+        query['api_key'] = self.api_key
+
+        last_error = None
+        tmdb_failed = False  # TMDB'nin kendisinden kaynaklanan hata görüldü mü (bütçe kesintisi değil)
+        for attempt in range(self.max_retries + 1):
+            remaining = self.timeout if deadline is None else deadline.remaining()
+            if remaining <= 0 or not self.bucket.acquire(timeout=None if deadline is None else remaining):
+                return self._give_up(tmdb_failed, last_error)
+
+            timeout = self.timeout if deadline is None else min(self.timeout, deadline.remaining())
+            if timeout <= 0:
+                return self._give_up(tmdb_failed, last_error)
+            self._count("requests")
+            response = None
+            try:
+                response = self.session.get(url, params=query, timeout=timeout)
+            except requests.RequestException as e:
+                last_error = TMDBError(f"TMDB request error: {e}")
+                # Timeout'u bütçe yüzünden kısalttıysak zaman aşımı TMDB'nin suçu değil
+                if not (isinstance(e, requests.Timeout) and timeout < self.timeout):
+                    tmdb_failed = True
+            else:
+                if response.status_code == 200:
+                    self.breaker.record_success()
+                    return response.json()
+                if response.status_code not in self.RETRY_STATUS_CODES:
+                    # 404 vb. - tekrar denemenin anlamı yok, TMDB sağlıklı
+                    self.breaker.record_success()
+                    raise TMDBError(f"TMDB API error: {response.status_code}", response.status_code)
+                if response.status_code == 429:
+                    self._count("throttled")
+                last_error = TMDBError(f"TMDB API error: {response.status_code}", response.status_code)
+                tmdb_failed = True
+
+            if attempt < self.max_retries:
+                delay = self._backoff(attempt, response)
+                if deadline is not None and delay >= deadline.remaining():
+                    # Bekleyip tekrar denemeye süre yetmiyor - çağıran çoktan vazgeçmiş olacak
+                    return self._give_up(tmdb_failed, last_error)
+                self._count("retries")
+                time.sleep(delay)
+
+        self._count("failures")
+        self.breaker.record_failure()
+        raise last_error
+
+    def _give_up(self, tmdb_failed, last_error):
+        """Zaman bütçesi bitti: gerçek TMDB hatası görüldüyse breaker'a say, yoksa denemeyi bırak"""
+        self._count("deadline_exceeded")
+        if tmdb_failed:
+            self._count("failures")
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+        message = "Request deadline exceeded during TMDB call"
+        if last_error is not None:
+            message += f" (last error: {last_error})"
+        raise DeadlineExceededError(message, getattr(last_error, 'status_code', None))
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["circuit"] = self.breaker.state
+        return stats
@@ -0,0 +1,192 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class RateLimiter:
+    """Saniyede en fazla `rate` çağrıya izin veren basit aralık sınırlayıcı"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait_for = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+
+def top_genre_combinations(genre_relationships, limit=30):
+    """GENRE_RELATIONSHIPS'ten ağırlığa göre en önemli genre kombinasyonlarını çıkar"""
+    combos = {}
+
+    for genre_id, info in genre_relationships.items():
+        weight = info.get("weight", 0.5)
+        combos[(genre_id,)] = max(combos.get((genre_id,), 0.0), weight)
+
+        # İlişkili türlerle ikili kombinasyonlar
+        for related_id in info.get("related", []):
+            related_weight = genre_relationships.get(related_id, {}).get("weight", 0.5)
+            key = tuple(sorted((genre_id, related_id)))
+            combos[key] = max(combos.get(key, 0.0), weight * related_weight)
+
+    ranked = sorted(combos.items(), key=lambda item: (-item[1], len(item[0]), item[0]))
+    return [list(combo) for combo, _ in ranked[:limit]]
+
+
+class CacheWarmer:
+    """Discover sayfalarını ve popüler film detaylarını arka planda önceden cache'le"""
+
+    def __init__(self, discover_fn, details_fn, genre_relationships,
+                 top_combinations=30, top_details=100, pages=1, concurrency=4, rate=10.0, interval=0,
+                 preload=None):
+        self.discover_fn = discover_fn
+        self.details_fn = details_fn
+        self.genre_relationships = genre_relationships
+        self.top_combinations = top_combinations
+        self.top_details = top_details
+        self.pages = max(1, pages)
+        self.concurrency = max(1, concurrency)
+        self.limiter = RateLimiter(rate)
+        self.interval = interval  # 0 = sadece başlangıçta bir kez
+        self.preload = preload  # İlk turdan önce bir kez çağrılır (ağır import'lar, modeller)
+        self._preloaded = False
+
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._state = {
+            "status": "idle",
+            "phase": None,
+            "total": 0,
+            "completed": 0,
+            "failed": 0,
+            "runs": 0,
+            "started_at": None,
+            "finished_at": None,
+            "last_error": None,
+            "preload_error": None
+        }
+        self._ready = False
+
+    # ---- Durum ----
+
+    @property
+    def ready(self):
+        return self._ready
+
+    def progress(self):
+        with self._lock:
+            state = dict(self._state)
+        state["ready"] = self._ready
+        state["progress"] = round(state["completed"] / state["total"], 3) if state["total"] else 0.0
+        return state
+
+    def _update(self, **changes):
+        with self._lock:
+            self._state.update(changes)
+
+    def _tick(self, ok):
+        with self._lock:
+            self._state["completed"] += 1
+            if not ok:
+                self._state["failed"] += 1
+
+    # ---- Çalıştırma ----
+
+    def start(self):
+        """Warmup'ı arka plan thread'inde başlat (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"❌ Warmup error: {e}")
+                self._update(status="failed", last_error=str(e), finished_at=datetime.now().isoformat())
+                # Warmup sadece bir optimizasyon - başarısız tur worker'ı trafikten sonsuza dek ayırmasın
+                self._ready = True
+
+            if not self.interval or self._stop.wait(self.interval):
+                break
+
+    def _call(self, fn, *args):
+        self.limiter.wait()
+        try:
+            result = fn(*args)
+            self._tick(bool(result))
+            return result
+        except Exception as e:
+            self._tick(False)
+            self._update(last_error=str(e))
+            return None
+
+    def run_once(self):
+        """Tek bir warmup turu: önce discover sayfaları, sonra popüler film detayları"""
+        if not self._run_lock.acquire(blocking=False):
+            print("⚠️ Warmup zaten çalışıyor, atlandı")
+            return
+        try:
+            self._run()
+        finally:
+            self._run_lock.release()
+
+    def _run(self):
+        if self.preload and not self._preloaded:
+            self._update(status="running", phase="preload", started_at=datetime.now().isoformat())
+            try:
+                self.preload()
+                self._preloaded = True
+                self._update(preload_error=None)
+            except Exception as e:
+                # Modüller ilk kullanımda yine yüklenir - cache ısıtmaya devam et, sonraki turda tekrar dene
+                print(f"⚠️ Warmup preload başarısız: {e}")
+                self._update(preload_error=f"{type(e).__name__}: {e}")
+
+        combos = top_genre_combinations(self.genre_relationships, self.top_combinations)
+        queries = [(combo, page) for combo in combos for page in range(1, self.pages + 1)]
+        self._update(status="running", phase="discover", total=len(queries) + self.top_details,
+                     completed=0, failed=0, started_at=datetime.now().isoformat(),
+                     finished_at=None, last_error=None)
+        print(f"🔥 Warmup başladı: {len(combos)} genre kombinasyonu")
+
+        candidates = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for movies in pool.map(lambda query: self._call(self.discover_fn, *query), queries):
+                for movie in movies or []:
+                    candidates.setdefault(movie["id"], movie)
+
+            # En popüler adayların detayları
+            popular = sorted(candidates.values(), key=lambda m: m.get("popularity", 0), reverse=True)
+            popular_ids = [movie["id"] for movie in popular[:self.top_details]]
+            with self._lock:
+                # Gerçek aday sayısına göre toplamı düzelt
+                self._state["total"] = len(queries) + len(popular_ids)
+                self._state["phase"] = "details"
+
+            list(pool.map(lambda movie_id: self._call(self.details_fn, movie_id), popular_ids))
+
+        with self._lock:
+            self._state["status"] = "completed"
+            self._state["phase"] = None
+            self._state["runs"] += 1
+            self._state["finished_at"] = datetime.now().isoformat()
+            failed = self._state["failed"]
+        self._ready = True
+        print(f"✅ Warmup tamamlandı: {len(queries)} discover, {len(popular_ids)} detay ({failed} hata)")
@@ -10,11 +10,16 @@ class MLService {
         try {
             console.log(`🎯 ML öneri isteği gönderiliyor: User ${userId}, ${likedMovies.length} beğeni`);
             
+            const timeoutMs = 30000; // 30 saniye timeout
             const response = await axios.post(`${this.baseURL}/ml/recommend`, {
                 user_id: userId,
                 liked_movies: likedMovies
             }, {
-                timeout: 30000  // 30 saniye timeout
+                timeout: timeoutMs,
+                headers: {
+                    // Python tarafı bu bütçeyi aşmadan (kısmi de olsa) cevap dönsün
+                    'X-Request-Timeout-Ms': String(timeoutMs - 2000)
+                }
             });
 
             console.log(`✅ ML önerileri alındı: ${response.data.recommendations.length} film`);